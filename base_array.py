@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+
+from array import array
+from collections import Iterable
+
+from helpers import hashed, remove_occurrences
+from mixins import GenericMixin, IndexMixin
+
+
+class aarray(GenericMixin, IndexMixin, array):
+    """
+    Replacement class for array.array, with the API of alist: a list of numbers (or characters)
+    of a single type, given by the typecode, stored unboxed (itemsize bytes per element).
+    Arrays expose the buffer protocol, eg numpy.frombuffer(a, a.typecode) shares their memory,
+    and a.tofile(f) writes it without conversion.
+    In place methods are redefined to return 'self' instead of None.
+    """
+    _root_class = array
+
+    def __new__(cls, typecode, *args):
+        """ Replacement constructor, admits a typecode then a single iterable or more than one parameter
+        """
+        if len(args) == 1 and isinstance(args[0], Iterable):
+            return array.__new__(cls, typecode, args[0])
+        else:
+            return array.__new__(cls, typecode, args)
+
+    @property
+    def _filter_constructor(self):
+        """ Filtered arrays keep the typecode
+        """
+        return lambda iterable: self.__class__(self.typecode, iterable)
+
+    # mutable methods (return self)
+
+    def clear(self):
+        """ clear returns self
+        """
+        del self[:]
+        return self
+
+    def append(self, x):
+        """ append replacement that returns self
+        """
+        array.append(self, x)
+        return self
+
+    def extend(self, iterable):
+        """ extend replacement that returns self
+        """
+        array.extend(self, iterable)
+        return self
+
+    def insert(self, i, x):
+        """ insert replacement that returns self
+        """
+        array.insert(self, i, x)
+        return self
+
+    def remove(self, value):
+        """ remove replacement that returns self
+        """
+        array.remove(self, value)
+        return self
+
+    def remove_all(self, iterable):
+        """ iterable version of remove, in a single pass (see helpers.remove_occurrences)
+            raises ValueError if an element of iterable is not found, leaving self unchanged
+        """
+        self[:] = array(self.typecode, remove_occurrences(self, iterable, strict=True))
+        return self
+
+    def discard(self, value):
+        """ Like remove except it does not raise ValueError exception
+        """
+        try:
+            array.remove(self, value)
+        except ValueError:
+            pass
+        return self
+
+    def discard_all(self, iterable):
+        """ iterable version of discard, in a single pass (see helpers.remove_occurrences)
+        """
+        self[:] = array(self.typecode, remove_occurrences(self, iterable))
+        return self
+
+    def reverse(self):
+        """ reverse replacement that returns self
+        """
+        array.reverse(self)
+        return self
+
+    def sort(self, **p):
+        """ Sorts the array in place, accepts the arguments of list.sort
+        """
+        self[:] = array(self.typecode, sorted(self, **p))
+        return self
+
+    def __iadd__(self, iterable):
+        return self.extend(iterable)
+
+    __isub__ = discard_all
+
+    # immutable methods (return another array)
+
+    def __add__(self, iterable):
+        """ Immutable version of extend
+        """
+        return self.__class__(self.typecode, self).extend(iterable)
+
+    def __sub__(self, iterable):
+        """ Returns a copy of self without any occurrence of the elements of iterable
+        """
+        iterable = hashed(iterable)
+        return self.__class__(self.typecode, (x for x in self if x not in iterable))
@@ -180,3 +180,113 @@ class adict(dict):
 
     __or__ = __add__
     __mul__ = __and__
+
+
+class bdict(adict):
+    """
+    Bidirectional dict: an adict keeping an inverse index (value: set of keys) up to date on
+    every change, so that keys_for() and reverse() do not scan the items.
+    Values must be hashable, and must not be modified in place.
+    """
+
+    def __init__(self, *args, **kwargs):
+        dict.__init__(self)
+        self._inverse = {}
+        self.update(*args, **kwargs)
+
+    def _unlink(self, k, v):
+        keys = self._inverse[v]
+        keys.discard(k)
+        if not keys:
+            del self._inverse[v]
+
+    def __setitem__(self, k, v):
+        # the value is hashed before anything is changed
+        keys = self._inverse.setdefault(v, set())
+        if k in self:
+            old = dict.__getitem__(self, k)
+            if self._inverse[old] is not keys:
+                self._unlink(k, old)
+        keys.add(k)
+        dict.__setitem__(self, k, v)
+
+    def __delitem__(self, k):
+        v = dict.__getitem__(self, k)
+        dict.__delitem__(self, k)
+        self._unlink(k, v)
+
+    def __reduce__(self):
+        return self.__class__, (dict(self),)
+
+    def pop(self, k, *default):
+        if k in self:
+            v = dict.pop(self, k)
+            self._unlink(k, v)
+            return v
+        return dict.pop(self, k, *default)
+
+    def popitem(self):
+        k, v = dict.popitem(self)
+        self._unlink(k, v)
+        return k, v
+
+    def setdefault(self, k, default=None):
+        if k not in self:
+            self[k] = default
+        return dict.__getitem__(self, k)
+
+    # mutable methods (return self)
+
+    def clear(self):
+        dict.clear(self)
+        self._inverse.clear()
+        return self
+
+    def update(self, E={}, **F):
+        """ Update replacement that updates the inverse index and returns self
+        """
+        if hasattr(E, 'keys'):
+            for k in E.keys():
+                self[k] = E[k]
+        else:
+            for k, v in E:
+                self[k] = v
+        for k, v in F.iteritems():
+            self[k] = v
+        return self
+
+    replace = update
+
+    # immutable methods (return another dict)
+
+    def reverse(self, duplicate=None):
+        """ reverse the dictionary (exchange keys and values) from the inverse index,
+            see adict.reverse for the duplicate policies.
+            Returns an adict, as values can be lists.
+        """
+        inverse = self._inverse
+        if not duplicate:
+            return adict((v, next(iter(keys))) for v, keys in inverse.iteritems())
+        if duplicate == 'raise':
+            for v, keys in inverse.iteritems():
+                if len(keys) > 1:
+                    k1, k2 = tuple(keys)[:2]
+                    raise DuplicateValueError("Duplicate value '%s' found for keys '%s' and '%s'" % (v, k2, k1))
+            return adict((v, next(iter(keys))) for v, keys in inverse.iteritems())
+        if duplicate == 'count':
+            return adict((v, len(keys)) for v, keys in inverse.iteritems())
+        if duplicate == 'list':
+            return adict((v, list(keys)) for v, keys in inverse.iteritems())
+        raise KeyError(duplicate)
+
+    # helper methods (return a value)
+
+    def keys_for(self, value):
+        """ Returns the set of the keys having this value (empty if none)
+        """
+        return frozenset(self._inverse.get(value, ()))
+
+    def count_of(self, value):
+        """ Returns the number of keys having this value, in constant time
+        """
+        return len(self._inverse.get(value, ()))
@@ -1,16 +1,24 @@
 # -*- coding: utf-8 -*-
 
+from bisect import bisect_left, bisect_right
 from collections import Iterable
+from weakref import WeakValueDictionary
 
-from helpers import mixin_factory
+from helpers import exclude, mixin_factory, remove_occurrences
+from mixins import CacheCountMixin
+from slices import ListView
 
 
 class alist(list):
     """
     Replacement class for list, with compatible API.
     In place methods are redefined to return 'self' instead of None.
+    Simple slices (without step) are copy on write views on the elements (see slices.ListView),
+    so that slicing is O(1).
     """
     _root_class = list
+    # slice views sharing the elements, made to copy them before any mutation
+    _views = None
 
     def __init__(self, *args):
         """ Replacement constructor, admits a single iterable or more than one parameter
@@ -20,6 +28,32 @@ class alist(list):
         else:
             list.__init__(self, args)
 
+    # slice views
+
+    def __getslice__(self, i, j):
+        # only simple slices are views, overriding __getitem__ would slow down indexing
+        if i <= 0 and j >= len(self):
+            # l[:] copies stay lists
+            return self.__class__(self)
+        return ListView.of(self, slice(i, j))
+
+    def _add_view(self, view):
+        # views are not hashable, they are weakly referenced by id
+        if self._views is None:
+            self._views = WeakValueDictionary()
+        self._views[id(view)] = view
+
+    def _detach_views(self):
+        views, self._views = self._views, None
+        for view in views.values():
+            view._own()
+
+    def __getstate__(self):
+        # the registry of the views is not pickled
+        state = self.__dict__.copy()
+        state.pop('_views', None)
+        return state
+
     # mutable methods (return self)
 
     def clear(self):
@@ -31,26 +65,40 @@ class alist(list):
     def append(self, x):
         """ append replacement that returns self
         """
+        if self._views is not None:
+            self._detach_views()
         list.append(self, x)
         return self
 
     def extend(self, iterable):
         """ extend replacement that returns self
         """
+        if self._views is not None:
+            self._detach_views()
         list.extend(self, iterable)
         return self
 
+    def insert(self, i, x):
+        """ insert replacement that returns self
+        """
+        if self._views is not None:
+            self._detach_views()
+        list.insert(self, i, x)
+        return self
+
     def remove(self, value):
         """ remove replacement that returns self
         """
+        if self._views is not None:
+            self._detach_views()
         list.remove(self, value)
         return self
 
     def remove_all(self, iterable):
-        """ iterable version of remove
+        """ iterable version of remove, in a single pass (see helpers.remove_occurrences)
+            raises ValueError if an element of iterable is not found, leaving self unchanged
         """
-        for i in iterable:
-            list.remove(self, i)
+        self[:] = remove_occurrences(self, iterable, strict=True)
         return self
 
     def remove_index(self, at):
@@ -69,6 +117,8 @@ class alist(list):
     def discard(self, value):
         """ Like remove except it does not raise ValueError exception
         """
+        if self._views is not None:
+            self._detach_views()
         try:
             list.remove(self, value)
         except ValueError:
@@ -76,10 +126,9 @@ class alist(list):
         return self
 
     def discard_all(self, iterable):
-        """ iterable version of discard
+        """ iterable version of discard, in a single pass (see helpers.remove_occurrences)
         """
-        for i in iterable:
-            self.discard(i)
+        self[:] = remove_occurrences(self, iterable)
         return self
 
     def discard_index(self, at):
@@ -91,18 +140,55 @@ class alist(list):
 
     discard_slice = remove_slice
 
+    def pop(self, i=-1):
+        if self._views is not None:
+            self._detach_views()
+        return list.pop(self, i)
+
     def reverse(self):
         """ reverse replacement that returns self
         """
-        list.reverse()
+        if self._views is not None:
+            self._detach_views()
+        list.reverse(self)
         return self
 
     def sort(self, **p):
         """ sort replacement that returns self
         """
+        if self._views is not None:
+            self._detach_views()
         list.sort(self, **p)
         return self
 
+    def __setitem__(self, i, x):
+        if self._views is not None:
+            self._detach_views()
+        list.__setitem__(self, i, x)
+
+    def __delitem__(self, i):
+        if self._views is not None:
+            self._detach_views()
+        list.__delitem__(self, i)
+
+    def __setslice__(self, i, j, sequence):
+        if self._views is not None:
+            self._detach_views()
+        list.__setslice__(self, i, j, sequence)
+
+    def __delslice__(self, i, j):
+        if self._views is not None:
+            self._detach_views()
+        list.__delslice__(self, i, j)
+
+    def __iadd__(self, iterable):
+        return self.extend(iterable)
+
+    def __imul__(self, n):
+        if self._views is not None:
+            self._detach_views()
+        return list.__imul__(self, n)
+
     __isub__ = discard_all
 
     # immutable methods (return another list)
@@ -125,9 +211,9 @@ class alist(list):
         return self.__class__(self).extend(iterable)
 
     def __sub__(self, iterable):
-        """ Immutable version of discard_all
+        """ Returns a copy of self without any occurrence of the elements of iterable
         """
-        return self.__class__(x for x in self if x not in iterable)
+        return self.__class__(exclude(self, iterable))
 
 
 class ListInsertMixin(object):
@@ -144,7 +230,212 @@ class ListInsertMixin(object):
             if i == -1:
                 return self.append(x)
             i += 1
-        list.insert(self, i, x)
+        return super(ListInsertMixin, self).insert(i, x)
+
+blist = mixin_factory('blist', ListInsertMixin, alist)
+
+# list with constant time 'in', see CacheCountMixin
+clist = mixin_factory('clist', CacheCountMixin, alist)
+
+
+class slist(alist):
+    """
+    Sorted list: the adding methods insert the elements at their place (according to key if given),
+    so that searches are O(log n). Equal elements are kept in insertion order.
+    Methods that would break the order (item and slice assignment, reverse, sort with arguments)
+    raise TypeError.
+    Elements (or their keys) must not be modified in place.
+    """
+    key = None
+    _key_list = None
+    # slices are plain lists, as the slist mutators do not maintain slice views
+    __getslice__ = list.__getslice__
+
+    def __init__(self, *args, **kwargs):
+        """ Admits a single iterable or more than one parameter, and a 'key' keyword argument
+        """
+        key = kwargs.pop('key', None)
+        if kwargs:
+            raise TypeError("unexpected keyword argument '%s'" % kwargs.keys()[0])
+        alist.__init__(self, *args)
+        if key is not None:
+            self.key = key
+        list.sort(self, key=key)
+        if key is not None:
+            self._key_list = map(key, self)
+
+    @property
+    def _keys(self):
+        """ The sorted list searched by bisect
+        """
+        return self if self.key is None else self._key_list
+
+    def _bounds(self, value):
+        """ Returns the slice of the elements whose key is equal to the key of value
+        """
+        k = value if self.key is None else self.key(value)
+        keys = self._keys
+        return bisect_left(keys, k), bisect_right(keys, k)
+
+    def _position(self, value, start=0, stop=None):
+        lo, hi = self._bounds(value)
+        start, stop, _ = slice(start, stop).indices(len(self))
+        lo, hi = max(lo, start), min(hi, stop)
+        try:
+            return lo + self[lo:hi].index(value)
+        except ValueError:
+            return -1
+
+    def _insort(self, x):
+        if self.key is None:
+            list.insert(self, bisect_right(self, x), x)
+        else:
+            k = self.key(x)
+            i = bisect_right(self._key_list, k)
+            self._key_list.insert(i, k)
+            list.insert(self, i, x)
+
+    # mutable methods (return self)
+
+    def append(self, x):
+        """ Inserts x at its place
+        """
+        self._insort(x)
+        return self
+
+    def insert(self, i, x):
+        """ Inserts x at its place, i is ignored
+        """
+        self._insort(x)
+        return self
+
+    def extend(self, iterable):
+        """ Inserts the elements of iterable at their place, each one with bisect if they are few,
+            else by sorting the whole list
+        """
+        items = list(iterable)
+        if len(items) * 8 < len(self):
+            for x in items:
+                self._insort(x)
+            return self
+        list.extend(self, items)
+        list.sort(self, key=self.key)
+        if self.key is not None:
+            self._key_list = map(self.key, self)
+        return self
+
+    def remove(self, value):
+        """ remove replacement that returns self, the element is found by bisection
+        """
+        i = self._position(value)
+        if i < 0:
+            raise ValueError('slist.remove(x): x not in list')
+        del self[i]
+        return self
+
+    def remove_all(self, iterable):
+        """ iterable version of remove
+        """
+        for x in iterable:
+            self.remove(x)
+        return self
+
+    def discard(self, value):
+        """ Like remove except it does not raise ValueError exception
+        """
+        i = self._position(value)
+        if i >= 0:
+            del self[i]
         return self
 
-blist = mixin_factory('blist', ListInsertMixin, alist)
\ No newline at end of file
+    def discard_all(self, iterable):
+        """ iterable version of discard
+        """
+        for x in iterable:
+            self.discard(x)
+        return self
+
+    def pop(self, i=-1):
+        x = self[i]
+        del self[i]
+        return x
+
+    def reverse(self):
+        raise TypeError('slist keeps its elements sorted')
+
+    def sort(self, **p):
+        """ Does nothing, elements are already sorted, raises TypeError if arguments are given
+        """
+        if p:
+            raise TypeError('slist keeps its elements sorted')
+        return self
+
+    def __setitem__(self, i, x):
+        raise TypeError('slist keeps its elements sorted')
+
+    def __setslice__(self, i, j, sequence):
+        raise TypeError('slist keeps its elements sorted')
+
+    def __delitem__(self, i):
+        list.__delitem__(self, i)
+        if self.key is not None:
+            del self._key_list[i]
+
+    def __delslice__(self, i, j):
+        self.__delitem__(slice(i, j))
+
+    def __iadd__(self, iterable):
+        return self.extend(iterable)
+
+    def __imul__(self, n):
+        if n <= 0:
+            return self.clear()
+        return self.extend(list(self) * (n - 1))
+
+    __isub__ = discard_all
+
+    # immutable methods (return another list)
+
+    def __add__(self, iterable):
+        """ Immutable version of extend
+        """
+        return self.__class__(self, key=self.key).extend(iterable)
+
+    def __sub__(self, iterable):
+        """ Returns a copy of self without any occurrence of the elements of iterable
+        """
+        return self.__class__(exclude(self, iterable), key=self.key)
+
+    # helper methods (return a value)
+
+    def __contains__(self, value):
+        return self._position(value) >= 0
+
+    def index(self, value, start=0, stop=None):
+        """ index replacement, in O(log n)
+        """
+        i = self._position(value, start, stop)
+        if i < 0:
+            raise ValueError('%r is not in list' % (value,))
+        return i
+
+    def count(self, value):
+        """ count replacement, in O(log n + number of elements having the key of value)
+        """
+        lo, hi = self._bounds(value)
+        return self[lo:hi].count(value)
+
+    def rank(self, value):
+        """ Returns the number of elements whose key is lower than the key of value,
+            ie the index value would be inserted at, before its equals
+        """
+        return bisect_left(self._keys, value if self.key is None else self.key(value))
+
+    def range(self, lo=None, hi=None):
+        """ Returns the list of the elements whose key is in [lo, hi), lo and hi being keys,
+            None meaning no bound
+        """
+        keys = self._keys
+        start = 0 if lo is None else bisect_left(keys, lo)
+        stop = len(self) if hi is None else bisect_left(keys, hi)
+        return self[start:stop]
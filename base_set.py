@@ -2,6 +2,8 @@
 
 from collections import Iterable
 
+from helpers import hashed
+
 
 class aset(set):
     # Fixme: complete methods set
@@ -52,6 +54,9 @@ class aset(set):
         return self.__class__(self).update(iterable)
 
     def __sub__(self, iterable):
+        iterable = hashed(iterable)
+        if isinstance(iterable, (set, frozenset)):
+            return self.__class__(set.difference(self, iterable))
         return self.__class__(x for x in self if x not in iterable)
 
     __or__ = __add__
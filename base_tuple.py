@@ -2,13 +2,17 @@
 
 from collections import Iterable
 
-from mixins import CacheSetMixin
+from mixins import CacheSetMixin, LazyCacheSetMixin
+from slices import TupleView
 
 
-class atuple(tuple):
+class atuple(LazyCacheSetMixin, tuple):
     # Fixme: must reimplement methods that return tuple (see __add__)
     """
     Replacement class for tuple, with compatible API.
+    Searches in long tuples use a set of the elements, built on the first search.
+    Simple slices (without step) are views on the elements (see slices.TupleView),
+    so that slicing is O(1).
     """
     _root_class = tuple
 
@@ -20,9 +24,18 @@ class atuple(tuple):
         else:
             return tuple.__new__(cls, args)
 
+    def __getslice__(self, i, j):
+        # only simple slices are views, overriding __getitem__ would slow down indexing
+        if i <= 0 and j >= len(self):
+            return self
+        return TupleView.of(self, slice(i, j))
+
     def __add__(self, iterable):
         # Fixme: possible optimization in py3
-        return self.__class__(tuple.__add__(self, tuple(iterable)))
+        # for long sequences built by successive additions, use persistent.ptuple
+        if not isinstance(iterable, tuple):
+            iterable = tuple(iterable)
+        return self.__class__(tuple.__add__(self, iterable))
 
     def last(self):
         try:
@@ -31,8 +44,7 @@ class atuple(tuple):
             pass
 
     def body(self):
-        l = len(self) - 1
-        return self.__class__(x for i, x in enumerate(self) if i < l)
+        return self[:-1]
 
     def first(self):
         try:
@@ -41,7 +53,7 @@ class atuple(tuple):
             pass
 
     def tail(self):
-        return self.__class__(x for i, x in enumerate(self) if i > 0)
+        return self[1:]
 
 
 class btuple(CacheSetMixin, atuple):
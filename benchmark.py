@@ -8,3 +8,39 @@ print timeit("'z' in t", "from base_tuple import atuple; t=atuple('a'*20 + 'z')"
 print timeit("'z' in t", "from base_tuple import btuple; t=btuple('a'*20+'z')")
 print timeit("'z' in t", "from base_tuple import atuple; t=atuple('a'*40 + 'z')")
 print timeit("'z' in t", "from base_tuple import btuple; t=btuple('a'*40+'z')")
+
+# fast paths of the default predicate against python level predicates
+print timeit("l.filter()", "from fcontainers import flist; l=flist(range(1000))", number=10000)
+print timeit("l.filter(lambda x: x)", "from fcontainers import flist; l=flist(range(1000))", number=10000)
+print timeit("l.count()", "from fcontainers import flist; l=flist(range(1000))", number=10000)
+print timeit("l.reduce(lambda x: [x])", "from fcontainers import flist; l=flist(range(1000))", number=1000)
+
+# calibration of helpers.contains_threshold: cost of building a set of a list, in average 'in' tests
+for n in (10, 100, 1000, 10000):
+    setup = "l = range(%d); m = %d // 2" % (n, n)
+    print n, timeit("set(l)", setup, number=1000) / timeit("m in l", setup, number=1000)
+
+# all_in against a list: scan of the list for each element, then adaptive strategy
+print timeit("all(i in c for i in l)", "from fcontainers import flist; l=flist(range(1000)); c=range(1000)", number=100)
+print timeit("l.all_in(c)", "from fcontainers import flist; l=flist(range(1000)); c=range(1000)", number=100)
+
+# history built by successive appends: atuple copies at each step, ptuple shares its trie
+print timeit("for i in xrange(5000): t = t + (i,)", "from base_tuple import atuple; t=atuple()", number=1)
+print timeit("for i in xrange(5000): t = t.append(i)", "from persistent import ptuple; t=ptuple()", number=1)
+
+# chained calls against direct method calls
+print timeit("l.append(1)", "l=[]", number=100000)
+print timeit("c.append(1)", "from chaining import Chain; c=Chain([])", number=100000)
+print timeit("l.append(1); l.append(2); l.sort()", "l=[]", number=10000)
+print timeit("c.append(1).append(2).sort()", "from chaining import Chain; c=Chain([])", number=10000)
+
+# deferred chain: fused filters, one sort and one extend, against the same eager calls
+setup = "from chaining import Chain, DeferredChain; from fcontainers import flist; l=flist(range(100000))"
+steps = ".filter(lambda x: x % 2).sort().filter(lambda x: x % 3).sort().extend([1]).extend([2]).filter(lambda x: x % 5)"
+print timeit("Chain(l)" + steps, setup, number=10)
+print timeit("DeferredChain(l)" + steps + ".run()", setup, number=10)
+
+# value to keys lookup: adict rebuilds the inverse, bdict keeps it up to date
+setup = "from base_dict import adict, bdict; d=adict((i, i % 100) for i in range(10000)); b=bdict(d)"
+print timeit("d.reverse('list')[5]", setup, number=100)
+print timeit("b.keys_for(5)", setup, number=100)
@@ -1,5 +1,53 @@
 # -*- coding: utf-8 -*-
 
+from collections import deque
+from itertools import chain, ifilterfalse, imap, islice
+from operator import is_
+from types import FunctionType, MethodType
+
+from helpers import _nothing
+
+
+# types of the functions found in classes, called with the instance as first argument
+_function_types = FunctionType, type(list.append), type(list.__add__)
+
+# (class of the wrapped object, method name): wrapper of the method, see Chain.__getattr__
+_dispatch = {}
+
+# (Chain class, class of the wrapped object): subclass holding the wrappers, see Chain.__new__
+_chain_classes = {}
+
+
+def _class_function(cls, name):
+    """ Returns the function defined as method 'name' in the mro of cls, or None
+    """
+    for klass in getattr(cls, '__mro__', ()):
+        if name in klass.__dict__:
+            function = klass.__dict__[name]
+            return function if isinstance(function, _function_types) else None
+
+
+def _wrapper(cls, name, function):
+    """ Returns a method of Chain calling function on the wrapped object,
+        or its attribute 'name' if the object is not an instance of cls
+    """
+    def method(self, *args, **kwargs):
+        obj = self.object
+        if obj.__class__ is cls:
+            ret = function(obj, *args, **kwargs)
+        else:
+            ret = getattr(obj, name)(*args, **kwargs)
+        # methods returning NOne or self are chained with same wrapper/object
+        if ret is None or ret is obj:
+            return self
+        # mutable classes have their muted result instances recasted,
+        # resulting in a new wrapper/object
+        if self.mutable and isinstance(ret, obj.__class__):
+            return self._push(ret)
+        return ret
+    method.__name__ = name
+    return method
+
 
 class Chain(object):
     """
@@ -10,24 +58,44 @@ class Chain(object):
     cloning method to the derivative, wich is O(n). Instead, the recasting of a Chain
     instance is O(1).
     Avoid use on immutable builtins (useless).
+    Instances belong to a subclass per class of the wrapped object, where the wrappers of
+    the methods are set when first called: methods of a class must not be replaced after
+    they have been called through a Chain.
     """
+    __slots__ = ('object', 'mutable')
+
+    def __new__(cls, obj, *args, **kwargs):
+        cls = cls.__dict__.get('_chain_class', cls)
+        key = cls, obj.__class__
+        try:
+            return object.__new__(_chain_classes[key])
+        except KeyError:
+            pass
+        subclass = _chain_classes[key] = type(cls)(cls.__name__, (cls,), {
+            '__slots__': (), '__module__': cls.__module__, '_chain_class': cls, '_wrapped_class': obj.__class__})
+        return object.__new__(subclass)
 
     def __init__(self, obj, mutable=True):
         self.object = obj
         self.mutable = mutable
 
     def __getattr__(self, item):
-        def method(*args, **kwarsg):
-            ret = getattr(self.object, item)(*args, **kwarsg)
-            # methods returning NOne or self are chained with same wrapper/object
-            if ret is None or ret is self.object:
-                return self
-            # mutable classes have their muted result instances recasted,
-            # resulting in a new wrapper/object
-            if self.mutable and isinstance(ret, self.object.__class__):
-                return self._push(ret)
-            return ret
-        return method
+        if item in Chain.__slots__:
+            raise AttributeError(item)
+        cls = self._wrapped_class
+        key = cls, item
+        try:
+            method = _dispatch[key]
+        except KeyError:
+            function = _class_function(cls, item)
+            if function is None:
+                # not a plain method of the class, eg an instance attribute: looked up at each call
+                return MethodType(_wrapper(None, item, None), self)
+            method = _dispatch[key] = _wrapper(cls, item, function)
+        # special methods are not set, so that operators keep failing on chains
+        if not item.startswith('__'):
+            setattr(self.__class__, item, method)
+        return MethodType(method, self)
 
     def _push(self, object):
         return self.__class__(object)
@@ -43,6 +111,7 @@ class ArturoChain(Chain):
     """
     This class does not recast immutable results, it simply changes inner instance
     """
+    __slots__ = ()
 
     def _push(self, obj):
         self.object = obj
@@ -53,6 +122,7 @@ class HistoryChain(Chain):
     """
     This class changes inner instance and records past instances
     """
+    __slots__ = ('history',)
 
     def __init__(self, obj, mutable=True):
         Chain.__init__(self, obj, mutable)
@@ -67,3 +137,211 @@ class HistoryChain(Chain):
         self.history.pop()
         self.object = self.history[-1]
         return self
+
+
+def _removed(old, new):
+    """ Returns the (index, element) pairs of old that are not in new, if new is old
+        with some elements removed (compared by identity), else None
+    """
+    removed = []
+    it = iter(new)
+    expected = next(it, _nothing)
+    for i, x in enumerate(old):
+        if x is expected:
+            expected = next(it, _nothing)
+        else:
+            removed.append((i, x))
+    if expected is _nothing:
+        return removed
+
+
+def _truncate(cls, obj, n):
+    return cls(islice(obj, n))
+
+
+def _insert(cls, obj, removed):
+    def merged():
+        it, j = iter(obj), 0
+        for i, x in removed:
+            for y in islice(it, i - j):
+                yield y
+            yield x
+            j = i + 1
+        for y in it:
+            yield y
+    return cls(merged())
+
+
+def _restore_items(cls, obj, data):
+    added, changed = data
+    items = dict(obj)
+    for k in added:
+        del items[k]
+    items.update(changed)
+    return cls(items)
+
+
+def _restore_set(cls, obj, data):
+    added, removed = data
+    return cls(chain(ifilterfalse(added.__contains__, obj), removed))
+
+
+def _snapshot(cls, obj, old):
+    return old
+
+
+def delta(old, new):
+    """ Returns the reverse delta (function, class, data) that rebuilds old from new,
+        its size is proportional to the differences between old and new:
+        - lists and tuples: length to truncate to, or removed elements with their positions,
+        - dicts: added keys and previous values of removed or changed keys,
+        - sets: added and removed elements,
+        other objects and differences are kept as a snapshot of old.
+    """
+    cls = old.__class__
+    if isinstance(old, (list, tuple)) and isinstance(new, (list, tuple)):
+        n = len(old)
+        if len(new) >= n:
+            if all(imap(is_, old, new)):
+                return _truncate, cls, n
+        else:
+            removed = _removed(old, new)
+            if removed is not None:
+                return _insert, cls, removed
+    elif isinstance(old, dict) and isinstance(new, dict):
+        added = [k for k in new if k not in old]
+        changed = dict((k, v) for k, v in old.iteritems() if k not in new or new[k] is not v)
+        return _restore_items, cls, (added, changed)
+    elif isinstance(old, (set, frozenset)) and isinstance(new, (set, frozenset)):
+        return _restore_set, cls, (frozenset(new.difference(old)), frozenset(old.difference(new)))
+    return _snapshot, cls, old
+
+
+class DeltaHistoryChain(Chain):
+    """
+    This class changes inner instance and records, instead of past instances, the reverse deltas
+    that rebuild them from the following ones (see delta), so that memory scales with the size
+    of the changes. Only the last 'depth' deltas are kept if depth is not None.
+    Past instances are rebuilt by backward(), from the current instance: it must not be
+    modified in place once a new instance has been pushed (use HistoryChain in this case).
+    """
+    __slots__ = ('depth', 'history')
+
+    def __init__(self, obj, mutable=True, depth=None):
+        Chain.__init__(self, obj, mutable)
+        self.depth = depth
+        self.history = deque(maxlen=depth)
+
+    def _push(self, obj):
+        self.history.append(delta(self.object, obj))
+        self.object = obj
+        return self
+
+    def backward(self):
+        f, cls, data = self.history.pop()
+        self.object = f(cls, self.object, data)
+        return self
+
+
+def _optimize(plan):
+    """ Returns the steps executing plan, a list of (method name, args, kwargs):
+        consecutive filters are fused in a single step, and moved before the sorts preceding them,
+        which then sort fewer elements (sorts are stable, so this gives the same result),
+        identical consecutive sorts are done once,
+        consecutive extends and appends, and consecutive discard_alls, are merged.
+    """
+    steps = []
+    for name, args, kwargs in plan:
+        last = steps[-1] if steps else None
+        if name == 'filter':
+            i = len(steps)
+            while i and steps[i - 1][0] == 'sort':
+                i -= 1
+            if i and steps[i - 1][0] == 'filter':
+                steps[i - 1][1].append(args)
+            else:
+                steps.insert(i, ('filter', [args]))
+        elif name == 'sort':
+            if last != ('sort', (args, kwargs)):
+                steps.append(('sort', (args, kwargs)))
+        else:
+            if name == 'append':
+                name, args = 'extend', ((args,),)
+            if last and last[0] == name:
+                last[1].append(args[0])
+            else:
+                steps.append((name, [args[0]]))
+    return steps
+
+
+class DeferredChain(Chain):
+    """
+    This class records the calls to filter, sort, extend, append and discard_all instead of running
+    them, and runs them at once, optimized (see _optimize), when run() is called or the inner
+    instance is read, eg by calling any other method.
+    Filtered instances replace the inner instance, they are recasted once per fused filters.
+    Arguments are used, and errors raised, at run time.
+    """
+    __slots__ = ('plan', '_object')
+
+    def __init__(self, obj, mutable=True):
+        self.plan = []
+        Chain.__init__(self, obj, mutable)
+
+    @property
+    def object(self):
+        if self.plan:
+            self.run()
+        return self._object
+
+    @object.setter
+    def object(self, obj):
+        self._object = obj
+
+    def _push(self, obj):
+        self.object = obj
+        return self
+
+    def _record(self, name, args, kwargs={}):
+        self.plan.append((name, args, kwargs))
+        return self
+
+    def filter(self, f=bool, negate=False):
+        return self._record('filter', (f, negate))
+
+    def sort(self, *args, **kwargs):
+        return self._record('sort', args, kwargs)
+
+    def extend(self, iterable):
+        return self._record('extend', (iterable,))
+
+    def append(self, x):
+        return self._record('append', x)
+
+    def discard_all(self, iterable):
+        return self._record('discard_all', (iterable,))
+
+    def run(self):
+        """ Runs the recorded calls
+        """
+        plan, self.plan = self.plan, []
+        for name, args in _optimize(plan):
+            obj = self._object
+            if name == 'filter':
+                if hasattr(obj, 'view'):
+                    view = obj.view()
+                    for f, negate in args:
+                        view = view.filter(f, negate)
+                    self._object = view.materialize()
+                else:
+                    for f, negate in args:
+                        obj = obj.filter(f, negate)
+                    self._object = obj
+            elif name == 'sort':
+                obj.sort(*args[0], **args[1])
+            elif len(args) == 1:
+                getattr(obj, name)(args[0])
+            else:
+                # a single extend (or discard_all) with all the values
+                getattr(obj, name)(list(chain.from_iterable(args)))
+        return self
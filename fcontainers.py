@@ -1,9 +1,15 @@
 # -*- coding: utf-8 -*-
 
-from helpers import add_attribute_self, yesman
+from helpers import add_attribute_self, contains_all, contains_any, hashed, remove_occurrences, yesman, _filter_index, \
+    _nothing, _predicate
 from collections import defaultdict, Iterable
-from operator import add
+from itertools import chain, ifilter, ifilterfalse, imap
+from operator import countOf
 
+from mixins import LazyCacheSetMixin
+from views import FilterView
+from query import Query
+import parallel
 from version import __version__
 
 
@@ -61,23 +67,46 @@ class FilterMixin(object):
 
     # immutable methods (return another self)
 
-    def filter(self, f=bool, negate=False):
+    def filter(self, f=bool, negate=False, lazy=False):
         """ Returns a copy of self, only retaining elements that satisfy f.
+            If lazy is True, returns a FilterView instead, evaluated only when iterated.
         """
         cls = getattr(self, 'iterable', self.__class__)
+        if lazy:
+            return FilterView(self.__iter__, cls, ((f, negate),))
         if negate:
-            return cls(x for x in self if not f(x))
+            return cls(ifilterfalse(_predicate(f), self))
         else:
-            return cls(x for x in self if f(x))
+            return cls(ifilter(_predicate(f), self))
 
-    def filter_index(self, f=yesman, negate=False):
+    def view(self):
+        """ Returns a lazy view of self, to be filtered in a single pass, see FilterView
+        """
+        return FilterView(self.__iter__, getattr(self, 'iterable', self.__class__))
+
+    def query(self):
+        """ Returns a query over the elements (keys for dicts) of self, see Query
+        """
+        return Query(self.__iter__, getattr(self, 'iterable', self.__class__))
+
+    def filter_parallel(self, f=bool, negate=False, processes=None, pool=None):
+        """ Parallel version of filter, for large containers and costly f, which must be picklable.
+            Chunks of elements are filtered by a pool of processes (a new one if pool is None).
+            Containers smaller than parallel.threshold are filtered serially.
+        """
+        if len(self) < parallel.threshold:
+            return self.filter(f, negate)
+        cls = getattr(self, 'iterable', self.__class__)
+        return cls(parallel.parallel_filter(self, f, negate, processes, pool))
+
+    def filter_index(self, f=yesman, negate=False, lazy=False):
         """ Returns a copy of self, only retaining index/elements pairs that satisfy f.
+            If lazy is True, returns a FilterView instead, evaluated only when iterated.
         """
         cls = getattr(self, 'iterable', self.__class__)
-        if negate:
-            return cls(x for i, x in enumerate(self) if not f(i, x))
-        else:
-            return cls(x for i, x in enumerate(self) if f(i, x))
+        if lazy:
+            return FilterView(lambda: _filter_index(self, f, negate), cls)
+        return cls(_filter_index(self, f, negate))
 
     # helper methods (return a value)
 
@@ -85,63 +114,95 @@ class FilterMixin(object):
         """ Returns the first element that satisfies f.
         """
         if negate:
-            for x in self:
-                if not f(x):
-                    return x
-        else:
-            for x in self:
-                if f(x):
-                    return x
+            return next(ifilterfalse(_predicate(f), self), None)
+        return next(ifilter(_predicate(f), self), None)
 
     def all(self, f=bool):
         """ True if all elements satisfy f
         """
-        return all(f(x) for x in self)
+        if f is bool:
+            return all(self)
+        return all(imap(f, self))
 
     def any(self, f=bool):
         """ True if any element satisfy f
         """
-        return any(f(x) for x in self)
+        if f is bool:
+            return any(self)
+        return any(imap(f, self))
 
     def contains_all(self, iterable):
         """ True if every element (or key) of iterable is in self
-            use preferably if self.__contains__() evaluates in constant time
+            if self.__contains__() does not evaluate in constant time, a temporary set is used
+            for long iterables, see helpers.contains_all
         """
-        return all(i in self for i in iterable)
+        return contains_all(self, iterable)
 
     def contains_any(self, iterable):
         """ True if any element (or key) of iterable is in self
-            use preferably if self.__contains__() evaluates in constant time
+            see helpers.contains_any
         """
-        return any(i in self for i in iterable)
+        return contains_any(self, iterable)
 
     def all_in(self, container):
         """ True if all elements (or keys) of self are also in container
-            use preferably if container.__contains__() evaluates in constant time
+            if container.__contains__() does not evaluate in constant time, a temporary set is used
+            for long containers, see helpers.contains_all
         """
-        return all(i in container for i in self)
+        return contains_all(container, self)
 
     def any_in(self, container):
         """ True if any element (or key) of self are also in container
-            use preferably if container.__contains__() evaluates in constant time
+            see helpers.contains_any
         """
-        return any(i in container for i in self)
+        return contains_any(container, self)
 
     def reduce(self, f=bool):
         """ Returns the sum of the values of f calculated on each element
             if f returns a boolean, this counts the number of elements that satisfy f
         """
-        return reduce(add, (f(x) for x in self))
-
-    count = reduce
+        values = imap(f, self)
+        try:
+            first = next(values)
+        except StopIteration:
+            return 0
+        # concatenations are done in a single pass instead of a quadratic series of additions
+        if isinstance(first, basestring):
+            return first[:0].join(chain((first,), values))
+        if isinstance(first, list):
+            return list(chain(first, *values))
+        if isinstance(first, tuple):
+            return tuple(chain(first, *values))
+        return sum(values, first)
+
+    def count(self, value=_nothing, f=bool):
+        """ Returns the number of occurrences of value if given, like list.count,
+            else the number of elements that satisfy f.
+            A callable value is taken as f, for compatibility with count(f),
+            use operator.countOf to count the occurrences of a callable.
+        """
+        if callable(value):
+            value, f = _nothing, value
+        if value is not _nothing:
+            return countOf(self, value)
+        if f is bool:
+            return sum(imap(bool, self))
+        return sum(imap(bool, imap(f, self)))
+
+    def sum(self, f=None, start=0):
+        """ Returns start plus the sum of the elements, or of the values of f calculated on each element
+        """
+        if f is None:
+            return sum(self, start)
+        return sum(imap(f, self), start)
 
 
 @add_attribute_self('iterable')
-class ftuple(FilterMixin, tuple):
-    # Fixme: optimize all_in, any_in (use a cached set ?)
+class ftuple(LazyCacheSetMixin, FilterMixin, tuple):
     """
     Replacement class for tuple, with better API and many useful methods.
     Many new methods have been added, they are classified as immutable, muttable and helpers
+    Searches in long tuples use a set of the elements, built on the first search.
     """
     root = tuple
 
@@ -154,11 +215,6 @@ class ftuple(FilterMixin, tuple):
         else:
             return tuple.__new__(cls, args)
 
-    def __sub__(self, other):
-        """ Returns a copy of self with element elem removed
-        """
-        pass
-
     def sub_index(self, index):
         """ Returns a copy of self with element @index removed
         """
@@ -220,10 +276,10 @@ class flist(FilterMixin, list):
         return self
 
     def remove_all(self, iterable):
-        """ iterable version of remove
+        """ iterable version of remove, in a single pass (see helpers.remove_occurrences)
+            raises ValueError if an element of iterable is not found, leaving self unchanged
         """
-        for i in iterable:
-            list.remove(self, i)
+        self[:] = remove_occurrences(self, iterable, strict=True)
         return self
 
     def remove_slice(self, start=None, end=None):
@@ -244,10 +300,9 @@ class flist(FilterMixin, list):
         return self
 
     def discard_all(self, iterable):
-        """ iterable version of discard
+        """ iterable version of discard, in a single pass (see helpers.remove_occurrences)
         """
-        for i in iterable:
-            self.discard(i)
+        self[:] = remove_occurrences(self, iterable)
         return self
 
     def reverse(self):
@@ -272,10 +327,9 @@ class flist(FilterMixin, list):
         return flist(self).extend(iterable)
 
     def __sub__(self, iterable):
-        # Fixme: optimize
         """ Immutable version of discard_all
         """
-        return flist(self).discard_all(iterable)
+        return flist(remove_occurrences(self, iterable))
 
 
 @add_attribute_self('iterable')
@@ -328,7 +382,10 @@ class fset(FilterMixin, set):
         return fset(self).update(iterable)
 
     def __sub__(self, iterable):
-        return fset(self)
+        iterable = hashed(iterable)
+        if isinstance(iterable, (set, frozenset)):
+            return fset(set.difference(self, iterable))
+        return fset(x for x in self if x not in iterable)
 
     __or__ = __add__
 
@@ -1,8 +1,23 @@
 # -*- coding: utf-8 -*-
 
+from itertools import compress, imap, islice, repeat, starmap
+from operator import not_
+import sys
+
+
+# number of membership tests done by scanning a container whose __contains__ is linear,
+# before building a temporary set of it, calibrated with benchmark.py:
+# building a set of a list costs 2 to 5 average 'in' tests
+contains_threshold = 4
+
+# number of values under which removing them one by one (C level scans) is faster than
+# removing them all in a single Python level pass, see remove_occurrences
+removal_threshold = 8
+
 
 def mixin_factory(name, base, *mixins):
-    return type(name, (base,) + mixins, {})
+    # the class belongs to the calling module, like namedtuple, so that its instances can be pickled
+    return type(name, (base,) + mixins, {'__module__': sys._getframe(1).f_globals.get('__name__')})
 
 
 def add_attributes(**kwargs):
@@ -26,3 +41,186 @@ def add_attribute_self(name):
 
 def yesman(*arsg):
     return True
+
+
+# default value of arguments for which None is meaningful
+_nothing = object()
+
+
+def _predicate(f):
+    """ Returns the predicate to give to ifilter/ifilterfalse, None standing for bool
+        so that truth is tested without calling a Python level function
+    """
+    return None if f is bool else f
+
+
+def _filter_index(sequence, f, negate):
+    """ Iterates over the elements x of sequence for which f(i, x) is true (false if negate),
+        the elements being selected by itertools.compress
+    """
+    if f is yesman:
+        selectors = repeat(not negate)
+    elif negate:
+        selectors = imap(not_, starmap(f, enumerate(sequence)))
+    else:
+        selectors = starmap(f, enumerate(sequence))
+    return compress(sequence, selectors)
+
+
+def constant_contains(container):
+    """ True if container.__contains__() evaluates in constant time.
+        Classes other than sets and dicts can tell it with a true '_constant_contains' attribute.
+    """
+    return isinstance(container, (set, frozenset, dict)) or getattr(container, '_constant_contains', False)
+
+
+def equality_contains(container):
+    """ True if x in container means that x equals an element (a key for dicts) of container,
+        so that container can be replaced by a set of its elements to search it.
+        This is not the case of strings (substrings are searched) or of any custom __contains__.
+    """
+    return isinstance(container, (list, tuple)) or constant_contains(container)
+
+
+def _memberships(container, iterable):
+    """ Yields, for each element of iterable, whether it is in container, container.__contains__()
+        being linear: the first 'contains_threshold' elements are searched by scanning container,
+        the next ones in a temporary set of it, unless some of its elements are not hashable
+        or its membership is not element equality (see equality_contains)
+    """
+    iterator = iter(iterable)
+    for x in islice(iterator, contains_threshold):
+        yield x in container
+    try:
+        if not equality_contains(container):
+            raise TypeError
+        cache = set(container)
+    except TypeError:
+        for x in iterator:
+            yield x in container
+        return
+    for x in iterator:
+        try:
+            yield x in cache
+        except TypeError:
+            # unhashable elements can only equal unhashable elements
+            yield x in container
+
+
+def contains_all(container, iterable):
+    """ True if every element of iterable is in container, with the fastest strategy:
+        set inclusion, short-circuit iteration on constant time containers,
+        or a temporary set of container if iterable is long
+    """
+    if isinstance(iterable, (set, frozenset)):
+        if isinstance(container, (set, frozenset)):
+            return iterable.issubset(container)
+        if equality_contains(container) and len(iterable) > len(container):
+            # iterable has more distinct elements than container
+            return False
+    if constant_contains(container):
+        return all(imap(container.__contains__, iterable))
+    return all(_memberships(container, iterable))
+
+
+def contains_any(container, iterable):
+    """ True if any element of iterable is in container, with the fastest strategy:
+        if membership in container is element equality, this is symmetric and membership is tested
+        in the constant time container if any, else in a temporary set of container if iterable is long
+    """
+    if isinstance(container, (set, frozenset)):
+        return not container.isdisjoint(iterable)
+    if constant_contains(container):
+        return any(imap(container.__contains__, iterable))
+    if equality_contains(container):
+        # the elements of container are hashed, they can be unhashable
+        try:
+            if isinstance(iterable, (set, frozenset)):
+                return not iterable.isdisjoint(container)
+            if constant_contains(iterable):
+                return any(imap(iterable.__contains__, container))
+        except TypeError:
+            pass
+    return any(_memberships(container, iterable))
+
+
+def hashed(iterable):
+    """ Returns a container of the elements of iterable with a constant time __contains__,
+        iterable itself if possible, else a set of its elements, or a tuple if they are not hashable.
+        Containers whose membership is not element equality (see equality_contains), eg strings,
+        are returned unchanged.
+    """
+    if constant_contains(iterable):
+        return iterable
+    if hasattr(iterable, '__contains__') and not equality_contains(iterable):
+        return iterable
+    if not isinstance(iterable, (tuple, list)):
+        iterable = tuple(iterable)
+    try:
+        return set(iterable)
+    except TypeError:
+        return iterable
+
+
+def exclude(sequence, iterable):
+    """ Iterates over the elements of sequence that are not in iterable, searched in hashed(iterable):
+        unhashable elements of sequence are not searched in a set, they can not equal its elements
+    """
+    values = hashed(iterable)
+    if not isinstance(values, (set, frozenset)):
+        return (x for x in sequence if x not in values)
+    return _exclude(sequence, values)
+
+
+def _exclude(sequence, values):
+    for x in sequence:
+        try:
+            if x in values:
+                continue
+        except TypeError:
+            pass
+        yield x
+
+
+def remove_occurrences(sequence, iterable, strict=False):
+    """ Returns the list of the elements of sequence without one occurrence (the first one)
+        of each element of iterable, as successive calls to list.remove would do, but in O(n + m):
+        the values to remove are counted in a dict, then sequence is filtered in a single pass.
+        If strict, raises ValueError if some value is not found, before anything is removed.
+        Few or unhashable values are removed one by one from a copy of sequence.
+    """
+    values = iterable if isinstance(iterable, (tuple, list)) else list(iterable)
+    counts = {}
+    if len(values) > removal_threshold:
+        try:
+            for v in values:
+                counts[v] = counts.get(v, 0) + 1
+        except TypeError:
+            counts = None
+    else:
+        counts = None
+    if counts is None:
+        result = list(sequence)
+        for v in values:
+            try:
+                result.remove(v)
+            except ValueError:
+                if strict:
+                    raise
+        return result
+    result = []
+    append = result.append
+    for x in sequence:
+        try:
+            n = counts.get(x)
+        except TypeError:
+            # unhashable elements can only equal unhashable values
+            append(x)
+            continue
+        if n:
+            counts[x] = n - 1
+        else:
+            append(x)
+    if strict and any(counts.itervalues()):
+        raise ValueError('list.remove(x): x not in list')
+    return result
@@ -0,0 +1,472 @@
+# -*- coding: utf-8 -*-
+
+from bisect import bisect_left, bisect_right, insort
+from collections import defaultdict
+from itertools import count, ifilter, imap
+from operator import itemgetter
+import sre_constants
+import sre_parse
+import sys
+
+from fcontainers import flist
+from predicates import Where
+
+operators = Where.operators
+infinity = float('inf')
+
+
+def lower(value):
+    """ Key of the indexes serving case insensitive operators
+    """
+    return value.lower()
+
+
+def successor(prefix):
+    """ Returns the smallest string greater than all the strings starting with prefix,
+        or None if there is no such string
+    """
+    top, char = (0xff, chr) if isinstance(prefix, str) else (sys.maxunicode, unichr)
+    while prefix:
+        last = ord(prefix[-1])
+        if last < top:
+            return prefix[:-1] + char(last + 1)
+        prefix = prefix[:-1]
+
+
+def trigrams(string):
+    return set(string[i:i + 3] for i in xrange(len(string) - 2))
+
+
+def required_literals(regexp):
+    """ Returns literal strings that every string searched or matched by regexp (a RegExp) contains
+    """
+    pattern = regexp.re.pattern
+    char = chr if isinstance(pattern, str) else unichr
+    literals, current = [], []
+
+    def walk(sequence):
+        for op, av in sequence:
+            if op == sre_constants.LITERAL:
+                current.append(char(av))
+                continue
+            if current:
+                literals.append(''.join(current))
+                del current[:]
+            if op == sre_constants.SUBPATTERN:
+                walk(av[-1])
+
+    walk(sre_parse.parse(pattern, regexp.re.flags))
+    if current:
+        literals.append(''.join(current))
+    return literals
+
+
+class Index(object):
+    """
+    Base class for the indexes of a field of records.
+    key is applied to the field value before indexing, it must be the coercion done by the
+    operators the index serves, eg int for Where(age__gt=12), lower for Where(name__ieq='bob').
+    Records are referred to by stamps, given by the indexed collection.
+    Records lacking the field are recorded apart, so that '_key_missing_' can be honoured.
+    Records whose field value can not be coerced by key are recorded in 'others', they are
+    candidates of every term, so that the Where evaluating them behaves as without index.
+    """
+
+    def __init__(self, field, key):
+        self.field = field
+        self.key = key
+        self.keys = {}
+        self.missing = set()
+        self.others = set()
+
+    def add(self, stamp, record):
+        try:
+            value = record[self.field]
+        except KeyError:
+            self.missing.add(stamp)
+            return
+        try:
+            key = self.key(value)
+        except (TypeError, ValueError, AttributeError):
+            self.others.add(stamp)
+            return
+        self.keys[stamp] = key
+        self._add(stamp, key)
+
+    def discard(self, stamp):
+        try:
+            key = self.keys.pop(stamp)
+        except KeyError:
+            self.missing.discard(stamp)
+            self.others.discard(stamp)
+        else:
+            self._discard(stamp, key)
+
+    def clear(self):
+        self.keys.clear()
+        self.missing.clear()
+        self.others.clear()
+
+    def candidates(self, op, value):
+        """ Returns the stamps of the records satisfying the term (field, op, value),
+            or None if the index can not serve this term
+        """
+        raise NotImplementedError
+
+
+class HashIndex(Index):
+    """
+    Index serving 'eq' terms whose value type is key, or 'ieq' terms if key is lower
+    """
+
+    def __init__(self, field, key):
+        Index.__init__(self, field, key)
+        self.table = defaultdict(set)
+
+    def _add(self, stamp, key):
+        self.table[key].add(stamp)
+
+    def _discard(self, stamp, key):
+        stamps = self.table[key]
+        stamps.discard(stamp)
+        if not stamps:
+            del self.table[key]
+
+    def clear(self):
+        Index.clear(self)
+        self.table.clear()
+
+    def candidates(self, op, value):
+        if op is operators['eq'] and type(value) is self.key or op is operators['ieq'] and self.key is lower:
+            return self.table.get(value, frozenset()) | self.others
+
+
+class SortedIndex(Index):
+    """
+    Index serving 'eq', 'gt', 'gte', 'lt', 'lte' and 'inrange' terms whose value type is key
+    """
+
+    def __init__(self, field, key):
+        Index.__init__(self, field, key)
+        self.entries = []
+
+    def _add(self, stamp, key):
+        insort(self.entries, (key, stamp))
+
+    def _discard(self, stamp, key):
+        del self.entries[bisect_left(self.entries, (key, stamp))]
+
+    def clear(self):
+        Index.clear(self)
+        del self.entries[:]
+
+    def _left(self, value):
+        return bisect_left(self.entries, (value,))
+
+    def _right(self, value):
+        return bisect_right(self.entries, (value, infinity))
+
+    def candidates(self, op, value):
+        if op is operators['inrange']:
+            lo, hi = value
+            if type(lo) is not self.key:
+                return
+            start, stop = self._left(lo), self._left(hi)
+        elif type(value) is not self.key:
+            return
+        elif op is operators['eq']:
+            start, stop = self._left(value), self._right(value)
+        elif op is operators['gt']:
+            start, stop = self._right(value), len(self.entries)
+        elif op is operators['gte']:
+            start, stop = self._left(value), len(self.entries)
+        elif op is operators['lt']:
+            start, stop = 0, self._left(value)
+        elif op is operators['lte']:
+            start, stop = 0, self._right(value)
+        else:
+            return
+        return set(imap(itemgetter(1), self.entries[start:stop])) | self.others
+
+
+class PrefixIndex(SortedIndex):
+    """
+    Index serving 'startswith' terms, and 'istartswith' terms if casefold is True,
+    in which case keys are lowered once, at indexing time.
+    Field values that are not strings are recorded in 'others', candidates of every term.
+    """
+
+    def __init__(self, field, casefold=False):
+        SortedIndex.__init__(self, field, lower if casefold else None)
+
+    def add(self, stamp, record):
+        try:
+            value = record[self.field]
+        except KeyError:
+            self.missing.add(stamp)
+            return
+        if isinstance(value, basestring):
+            key = self.keys[stamp] = value if self.key is None else value.lower()
+            self._add(stamp, key)
+        else:
+            self.others.add(stamp)
+
+    def candidates(self, op, value):
+        if not isinstance(value, basestring):
+            # eg a tuple of prefixes
+            return
+        if op is operators['istartswith'] and self.key is lower:
+            pass
+        elif op is operators['startswith']:
+            # a case folded index gives a superset of the records, checked afterwards by the Where
+            if self.key is lower:
+                value = value.lower()
+        else:
+            return
+        end = successor(value)
+        stop = len(self.entries) if end is None else self._left(end)
+        return set(imap(itemgetter(1), self.entries[self._left(value):stop])) | self.others
+
+
+class TrigramIndex(Index):
+    """
+    Index serving 'contains', 'icontains', 'search' and 'match' terms with the trigrams of the
+    lowered field values. Candidates are the records having all the trigrams of the searched
+    literals (literals of at least 3 characters, for regexps the ones required by the pattern),
+    they are checked by the Where afterwards.
+    Field values that are not strings are always candidates of 'contains' terms, which apply to them.
+    """
+
+    def __init__(self, field):
+        Index.__init__(self, field, lower)
+        self.postings = defaultdict(set)
+
+    def add(self, stamp, record):
+        try:
+            value = record[self.field]
+        except KeyError:
+            self.missing.add(stamp)
+            return
+        if isinstance(value, basestring):
+            key = self.keys[stamp] = value.lower()
+            self._add(stamp, key)
+        else:
+            self.others.add(stamp)
+
+    def _add(self, stamp, key):
+        for gram in trigrams(key):
+            self.postings[gram].add(stamp)
+
+    def _discard(self, stamp, key):
+        for gram in trigrams(key):
+            stamps = self.postings[gram]
+            stamps.discard(stamp)
+            if not stamps:
+                del self.postings[gram]
+
+    def clear(self):
+        Index.clear(self)
+        self.postings.clear()
+
+    def candidates(self, op, value):
+        if op in (operators['contains'], operators['icontains']) and isinstance(value, basestring):
+            literals = [value]
+        elif op is operators['search']:
+            literals = required_literals(value)
+        else:
+            return
+        grams = set()
+        for literal in literals:
+            grams |= trigrams(literal.lower())
+        if not grams:
+            return
+        found = sorted((self.postings.get(gram, frozenset()) for gram in grams), key=len)
+        found = found[0].intersection(*found[1:])
+        if op is operators['contains']:
+            found |= self.others
+        return found
+
+
+class IndexedList(flist):
+    """
+    flist of records (typically dicts) maintaining indexes on some of their fields,
+    so that filter() answers Where queries without evaluating every record.
+    Indexes are kept up to date by the list methods, but records must not be modified in place.
+    Appending is cheap, whereas insert, sort, reverse and slice assignment reindex the whole list.
+    """
+
+    def __init__(self, *args):
+        flist.__init__(self, *args)
+        self.indexes = []
+        self._reindex()
+
+    def add_index(self, index):
+        """ Adds an index (an instance of a subclass of Index) and fills it
+        """
+        for stamp, record in zip(self._stamps, self):
+            index.add(stamp, record)
+        self.indexes.append(index)
+        return self
+
+    # indexes management
+
+    def _reindex(self):
+        """ Stamps records in list order and rebuilds the indexes
+        """
+        self._stamps = range(len(self))
+        self._records = dict(enumerate(self))
+        self._counter = count(len(self))
+        for index in self.indexes:
+            index.clear()
+            for stamp, record in enumerate(self):
+                index.add(stamp, record)
+
+    def _index(self, stamp, record):
+        self._records[stamp] = record
+        for index in self.indexes:
+            index.add(stamp, record)
+
+    def _unindex(self, stamp):
+        del self._records[stamp]
+        for index in self.indexes:
+            index.discard(stamp)
+
+    def _delete(self, i):
+        self._unindex(self._stamps[i])
+        del self._stamps[i]
+        list.__delitem__(self, i)
+
+    def _candidates(self, where):
+        """ Returns the stamps of the records that may satisfy where,
+            or None if a conjunction of where can not be served by any index
+        """
+        stamps = set()
+        for term in where.terms:
+            found = []
+            for field, op, value in term:
+                for index in self.indexes:
+                    if index.field != field:
+                        continue
+                    candidates = index.candidates(op, value)
+                    if candidates is None:
+                        continue
+                    if index.missing:
+                        if where.missing is None:
+                            return
+                        if where.missing:
+                            candidates = candidates | index.missing
+                    found.append(candidates)
+            if not found:
+                return
+            found.sort(key=len)
+            stamps |= found[0].intersection(*found[1:])
+        return stamps
+
+    # mutable methods (return self)
+
+    def clear(self):
+        flist.clear(self)
+        self._reindex()
+        return self
+
+    def append(self, x):
+        stamp = next(self._counter)
+        list.append(self, x)
+        self._stamps.append(stamp)
+        self._index(stamp, x)
+        return self
+
+    def extend(self, iterable):
+        for x in iterable:
+            self.append(x)
+        return self
+
+    def insert(self, i, x):
+        if i == -1:
+            return self.append(x)
+        flist.insert(self, i, x)
+        self._reindex()
+        return self
+
+    def remove(self, value):
+        self._delete(self.index(value))
+        return self
+
+    def remove_all(self, iterable):
+        for x in iterable:
+            self.remove(x)
+        return self
+
+    def discard(self, value):
+        try:
+            self._delete(self.index(value))
+        except ValueError:
+            pass
+        return self
+
+    def discard_all(self, iterable):
+        for x in iterable:
+            self.discard(x)
+        return self
+
+    def pop(self, i=-1):
+        x = self[i]
+        self._delete(i)
+        return x
+
+    def reverse(self):
+        list.reverse(self)
+        self._reindex()
+        return self
+
+    def sort(self, **p):
+        flist.sort(self, **p)
+        self._reindex()
+        return self
+
+    def __setitem__(self, i, x):
+        if isinstance(i, slice):
+            list.__setitem__(self, i, x)
+            self._reindex()
+        else:
+            stamp = self._stamps[i]
+            self._unindex(stamp)
+            list.__setitem__(self, i, x)
+            self._index(stamp, x)
+
+    def __delitem__(self, i):
+        if isinstance(i, slice):
+            for stamp in self._stamps[i]:
+                self._unindex(stamp)
+            del self._stamps[i]
+            list.__delitem__(self, i)
+        else:
+            self._delete(i)
+
+    def __setslice__(self, i, j, sequence):
+        self.__setitem__(slice(i, j), sequence)
+
+    def __delslice__(self, i, j):
+        self.__delitem__(slice(i, j))
+
+    def __iadd__(self, iterable):
+        return self.extend(iterable)
+
+    def __imul__(self, n):
+        list.__imul__(self, n)
+        self._reindex()
+        return self
+
+    __isub__ = discard_all
+
+    # immutable methods (return another list)
+
+    def filter(self, f=bool, negate=False, lazy=False):
+        """ Like flist.filter, except that Where queries are answered with the indexes if possible.
+            The returned list is a plain flist. Lazy views do not use the indexes.
+        """
+        if isinstance(f, Where) and not negate and not lazy:
+            stamps = self._candidates(f)
+            if stamps is not None:
+                return self.iterable(ifilter(f, imap(self._records.__getitem__, sorted(stamps))))
+        return flist.filter(self, f, negate, lazy)
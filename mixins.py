@@ -1,75 +1,137 @@
 # -*- coding: utf-8 -*-
 
 from bisect import bisect_left
-from operator import add
+from itertools import chain, ifilter, ifilterfalse, imap
+from operator import countOf
 
-from helpers import yesman
+from helpers import contains_all, contains_any, exclude, hashed, remove_occurrences, yesman, _filter_index, _nothing, \
+    _predicate
+from views import FilterView
+from query import Query
+import parallel
 
 
 class GenericMixin(object):
 
-    def filter(self, f=bool, negate=False):
+    def filter(self, f=bool, negate=False, lazy=False):
         """ Returns a copy of self, only retaining elements that satisfy f.
             The returned object's class can be (or must be) different from the original class.
             This is specified in '_filter_constructor' optional class attribute.
+            If lazy is True, returns a FilterView instead, evaluated only when iterated.
         """
         cls = getattr(self, '_filter_constructor', self.__class__)
+        if lazy:
+            return FilterView(self.__iter__, cls, ((f, negate),))
         if negate:
-            return cls(x for x in self if not f(x))
+            return cls(ifilterfalse(_predicate(f), self))
         else:
-            return cls(x for x in self if f(x))
+            return cls(ifilter(_predicate(f), self))
+
+    def view(self):
+        """ Returns a lazy view of self, to be filtered in a single pass, see FilterView
+        """
+        return FilterView(self.__iter__, getattr(self, '_filter_constructor', self.__class__))
+
+    def query(self):
+        """ Returns a query over the elements of self, see Query
+        """
+        return Query(self.__iter__, getattr(self, '_filter_constructor', self.__class__))
+
+    def filter_parallel(self, f=bool, negate=False, processes=None, pool=None):
+        """ Parallel version of filter, for large containers and costly f, which must be picklable.
+            Chunks of elements are filtered by a pool of processes (a new one if pool is None).
+            Containers smaller than parallel.threshold are filtered serially.
+        """
+        if len(self) < parallel.threshold:
+            return self.filter(f, negate)
+        cls = getattr(self, '_filter_constructor', self.__class__)
+        return cls(parallel.parallel_filter(self, f, negate, processes, pool))
 
     def first(self, f=bool, negate=False):
         """ Returns the first element that satisfies f.
         """
         if negate:
-            for x in self:
-                if not f(x):
-                    return x
-        else:
-            for x in self:
-                if f(x):
-                    return x
+            return next(ifilterfalse(_predicate(f), self), None)
+        return next(ifilter(_predicate(f), self), None)
 
     def all(self, f=bool):
         """ True if all elements satisfy f
         """
-        return all(f(x) for x in self)
+        if f is bool:
+            return all(self)
+        return all(imap(f, self))
 
     def any(self, f=bool):
         """ True if any element satisfy f
         """
-        return any(f(x) for x in self)
+        if f is bool:
+            return any(self)
+        return any(imap(f, self))
 
     def contains_all(self, iterable):
         """ True if every element (or key) of iterable is in self
-            use preferably if self.__contains__() evaluates in constant time
+            if self.__contains__() does not evaluate in constant time, a temporary set is used
+            for long iterables, see helpers.contains_all
         """
-        return all(i in self for i in iterable)
+        return contains_all(self, iterable)
 
     def contains_any(self, iterable):
         """ True if any element (or key) of iterable is in self
-            use preferably if self.__contains__() evaluates in constant time
+            see helpers.contains_any
         """
-        return any(i in self for i in iterable)
+        return contains_any(self, iterable)
 
     def all_in(self, container):
         """ True if all elements (or keys) of self are also in container
-            use preferably if container.__contains__() evaluates in constant time
+            if container.__contains__() does not evaluate in constant time, a temporary set is used
+            for long containers, see helpers.contains_all
         """
-        return all(i in container for i in self)
+        return contains_all(container, self)
 
     def any_in(self, container):
         """ True if any element (or key) of self are also in container
-            use preferably if container.__contains__() evaluates in constant time
+            see helpers.contains_any
         """
-        return any(i in container for i in self)
+        return contains_any(container, self)
 
     def reduce(self, f=bool):
         """ Returns the sum of the values of f calculated on each element
             if f returns a boolean, this counts the number of elements that satisfy f
         """
-        return reduce(add, (f(x) for x in self))
+        values = imap(f, self)
+        try:
+            first = next(values)
+        except StopIteration:
+            return 0
+        # concatenations are done in a single pass instead of a quadratic series of additions
+        if isinstance(first, basestring):
+            return first[:0].join(chain((first,), values))
+        if isinstance(first, list):
+            return list(chain(first, *values))
+        if isinstance(first, tuple):
+            return tuple(chain(first, *values))
+        return sum(values, first)
+
+    def count(self, value=_nothing, f=bool):
+        """ Returns the number of occurrences of value if given, like list.count,
+            else the number of elements that satisfy f.
+            A callable value is taken as f, for compatibility with count(f),
+            use operator.countOf to count the occurrences of a callable.
+        """
+        if callable(value):
+            value, f = _nothing, value
+        if value is not _nothing:
+            return countOf(self, value)
+        if f is bool:
+            return sum(imap(bool, self))
+        return sum(imap(bool, imap(f, self)))
+
+    def sum(self, f=None, start=0):
+        """ Returns start plus the sum of the elements, or of the values of f calculated on each element
+        """
+        if f is None:
+            return sum(self, start)
+        return sum(imap(f, self), start)
 
 
 class IndexMixin(object):
@@ -77,13 +139,15 @@ class IndexMixin(object):
     Mixin suitable for tuple and list derivatives
     """
 
-    def filter_index(self, f=yesman, negate=False):
+    def filter_index(self, f=yesman, negate=False, lazy=False):
         """ Returns a copy of self, only retaining index/elements pairs that satisfy f.
+            Like filter, the returned object's class is given by '_filter_constructor' if any.
+            If lazy is True, returns a FilterView instead, evaluated only when iterated.
         """
-        if negate:
-            return self.__class__(x for i, x in enumerate(self) if not f(i, x))
-        else:
-            return self.__class__(x for i, x in enumerate(self) if f(i, x))
+        cls = getattr(self, '_filter_constructor', self.__class__)
+        if lazy:
+            return FilterView(lambda: _filter_index(self, f, negate), cls)
+        return cls(_filter_index(self, f, negate))
 
     def get(self, pos, default=None):
         """ Equivalent of dict.get for list: returns a default value if index is out of range
@@ -123,9 +187,13 @@ class MappingMixin(object):
     Mixin suitable for dict derivatives
     """
 
-    def filter_dict(self, f=yesman, negate=False):
+    def filter_dict(self, f=yesman, negate=False, lazy=False):
         """ Returns a copy of self filtered by f(key, value)
+            If lazy is True, returns a FilterView of (key, value) pairs instead,
+            evaluated only when iterated.
         """
+        if lazy:
+            return FilterView(self.iteritems, self.__class__, ((lambda item: f(*item), negate),))
         if negate:
             return self.__class__((k, v) for k, v in self.iteritems() if not f(k, v))
         else:
@@ -137,6 +205,7 @@ class CacheSetMixin(object):
     Mixin used to have a constant search time.
     Use only if length is > 20
     """
+    _constant_contains = True
 
     def __init__(self, *args):
         super(CacheSetMixin, self).__init__(*args)
@@ -144,3 +213,183 @@ class CacheSetMixin(object):
 
     def __contains__(self, item):
         return item in self._set_cache
+
+
+class LazyCacheSetMixin(object):
+    """
+    Mixin for tuples: the first search in an instance longer than cache_threshold
+    builds a set of its elements, then used by the following searches.
+    Shorter instances are searched by scanning, as well as instances having unhashable elements.
+    """
+    cache_threshold = 20
+    # None until built, False if elements are not hashable
+    _set_cache = None
+
+    @property
+    def _constant_contains(self):
+        return len(self) > self.cache_threshold and self._set_cache is not False
+
+    def __contains__(self, item):
+        cache = self._set_cache
+        if cache is None:
+            if len(self) <= self.cache_threshold:
+                return tuple.__contains__(self, item)
+            try:
+                cache = self._set_cache = set(self)
+            except TypeError:
+                cache = self._set_cache = False
+        if cache:
+            try:
+                return item in cache
+            except TypeError:
+                pass
+        return tuple.__contains__(self, item)
+
+    def __sub__(self, iterable):
+        """ Returns a copy of self without the elements of iterable, or self if none of them is in self
+        """
+        iterable = hashed(iterable)
+        if not contains_any(self, iterable):
+            return self
+        return self.__class__(exclude(self, iterable))
+
+
+class CacheCountMixin(object):
+    """
+    Mixin giving a constant search time to mutable lists: a multiset (value: count) of the elements
+    is kept up to date by every mutating method, so it must come before the list class in the bases.
+    Elements must not be modified in place. If an element is not hashable, the multiset is dropped
+    and searches are linear again, until the list is cleared.
+    """
+    # unpickling appends the elements before restoring the multiset
+    _count_cache = None
+
+    def __init__(self, *args):
+        super(CacheCountMixin, self).__init__(*args)
+        self._count_cache = {}
+        self._count(self)
+
+    @property
+    def _constant_contains(self):
+        return self._count_cache is not None
+
+    def _count(self, iterable):
+        cache = self._count_cache
+        if cache is None:
+            return
+        try:
+            for x in iterable:
+                cache[x] = cache.get(x, 0) + 1
+        except TypeError:
+            self._count_cache = None
+
+    def _uncount(self, iterable):
+        cache = self._count_cache
+        if cache is None:
+            return
+        for x in iterable:
+            n = cache[x] - 1
+            if n:
+                cache[x] = n
+            else:
+                del cache[x]
+
+    def __contains__(self, item):
+        cache = self._count_cache
+        if cache is not None:
+            try:
+                return item in cache
+            except TypeError:
+                pass
+        return super(CacheCountMixin, self).__contains__(item)
+
+    # mutable methods (return self)
+
+    def clear(self):
+        super(CacheCountMixin, self).clear()
+        self._count_cache = {}
+        return self
+
+    def append(self, x):
+        super(CacheCountMixin, self).append(x)
+        self._count((x,))
+        return self
+
+    def extend(self, iterable):
+        start = len(self)
+        super(CacheCountMixin, self).extend(iterable)
+        self._count(self[start:])
+        return self
+
+    def insert(self, i, x):
+        super(CacheCountMixin, self).insert(i, x)
+        self._count((x,))
+        return self
+
+    def remove(self, value):
+        super(CacheCountMixin, self).remove(value)
+        self._uncount((value,))
+        return self
+
+    def _replace_all(self, elements):
+        # the elements left are counted again, in a single pass like the removal
+        super(CacheCountMixin, self).__setitem__(slice(None), elements)
+        if self._count_cache is not None:
+            self._count_cache = {}
+            self._count(self)
+        return self
+
+    def remove_all(self, iterable):
+        """ iterable version of remove, in a single pass (see helpers.remove_occurrences)
+            raises ValueError if an element of iterable is not found, leaving self unchanged
+        """
+        return self._replace_all(remove_occurrences(self, iterable, strict=True))
+
+    def discard(self, value):
+        if value in self:
+            self.remove(value)
+        return self
+
+    def discard_all(self, iterable):
+        """ iterable version of discard, in a single pass (see helpers.remove_occurrences)
+        """
+        return self._replace_all(remove_occurrences(self, iterable))
+
+    def pop(self, i=-1):
+        x = super(CacheCountMixin, self).pop(i)
+        self._uncount((x,))
+        return x
+
+    def __setitem__(self, i, x):
+        if isinstance(i, slice):
+            x = list(x)
+            old = list.__getitem__(self, i)
+        else:
+            old = (list.__getitem__(self, i),)
+        super(CacheCountMixin, self).__setitem__(i, x)
+        self._uncount(old)
+        self._count(x if isinstance(i, slice) else (x,))
+
+    def __delitem__(self, i):
+        old = list.__getitem__(self, i)
+        super(CacheCountMixin, self).__delitem__(i)
+        self._uncount(old if isinstance(i, slice) else (old,))
+
+    def __setslice__(self, i, j, sequence):
+        self.__setitem__(slice(i, j), sequence)
+
+    def __delslice__(self, i, j):
+        self.__delitem__(slice(i, j))
+
+    def __iadd__(self, iterable):
+        return self.extend(iterable)
+
+    def __isub__(self, iterable):
+        return self.discard_all(iterable)
+
+    def __imul__(self, n):
+        super(CacheCountMixin, self).__imul__(n)
+        if self._count_cache is not None:
+            self._count_cache = {}
+            self._count(self)
+        return self
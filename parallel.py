@@ -0,0 +1,38 @@
+# -*- coding: utf-8 -*-
+
+from itertools import chain, ifilter, ifilterfalse
+from multiprocessing import Pool, cpu_count
+
+# containers smaller than this are filtered serially, the cost of a pool would not be paid back
+threshold = 50000
+
+# number of chunks per process, more chunks balance the load when f has an irregular cost
+chunks_per_process = 4
+
+
+def _filter_chunk(args):
+    f, negate, chunk = args
+    if negate:
+        return list(ifilterfalse(f, chunk))
+    return list(ifilter(f, chunk))
+
+
+def parallel_filter(iterable, f=bool, negate=False, processes=None, pool=None):
+    """ Returns the list of the elements of iterable that satisfy f, in the same order,
+        the evaluation of f being dispatched by chunks to a pool of processes.
+        f must be picklable (Where instances and module level functions are, lambdas are not).
+        If pool is None, a pool of processes is created for the call.
+    """
+    items = iterable if isinstance(iterable, (list, tuple)) else list(iterable)
+    own = pool is None
+    if own:
+        pool = Pool(processes)
+    try:
+        n = (processes or cpu_count()) * chunks_per_process
+        size = max(1, -(-len(items) // n))
+        results = pool.map(_filter_chunk, [(f, negate, items[i:i + size]) for i in xrange(0, len(items), size)])
+    finally:
+        if own:
+            pool.close()
+            pool.join()
+    return list(chain.from_iterable(results))
@@ -0,0 +1,572 @@
+# -*- coding: utf-8 -*-
+
+"""
+Persistent (immutable) containers: operations return new instances sharing most of their structure
+with the original one, so that deriving a version costs O(log n) time and memory instead of a copy.
+"""
+
+from collections import Iterable, Mapping
+from itertools import imap
+from operator import eq
+
+from base_dict import ReverseDictFactory
+from helpers import yesman
+from mixins import GenericMixin, IndexMixin
+
+_bits = 5
+_width = 1 << _bits
+_mask = _width - 1
+# hashes are made unsigned, their bits are consumed 5 by 5 from the root of the trie,
+# when they are exhausted, keys of equal hashes are stored in collision nodes
+_hash_mask = (1 << 64) - 1
+_max_shift = 64
+
+
+def _hash(key):
+    return hash(key) & _hash_mask
+
+
+def _popcount(n):
+    return bin(n).count('1')
+
+
+class _Missing(object):
+    pass
+
+
+class _Bitmap(object):
+    """
+    Node of the trie: entries holds, for each bit set in bitmap, either a leaf (hash, key, value)
+    or a child node
+    """
+    __slots__ = ('bitmap', 'entries')
+
+    def __init__(self, bitmap, entries):
+        self.bitmap = bitmap
+        self.entries = entries
+
+    def get(self, shift, h, key, default):
+        node = self
+        while True:
+            bit = 1 << ((h >> shift) & _mask)
+            if not node.bitmap & bit:
+                return default
+            entry = node.entries[_popcount(node.bitmap & (bit - 1))]
+            if type(entry) is tuple:
+                return entry[2] if entry[0] == h and entry[1] == key else default
+            node, shift = entry, shift + _bits
+            if type(node) is _Collision:
+                return node.get(shift, h, key, default)
+
+    def assoc(self, shift, h, key, value):
+        """ Returns the node with key set to value, and whether key was added
+        """
+        bit = 1 << ((h >> shift) & _mask)
+        i = _popcount(self.bitmap & (bit - 1))
+        entries = self.entries
+        if not self.bitmap & bit:
+            return _Bitmap(self.bitmap | bit, entries[:i] + ((h, key, value),) + entries[i:]), True
+        entry = entries[i]
+        if type(entry) is tuple:
+            if entry[0] == h and entry[1] == key:
+                if entry[2] is value:
+                    return self, False
+                child, added = (h, key, value), False
+            else:
+                child, added = _pair(shift + _bits, entry, (h, key, value)), True
+        else:
+            child, added = entry.assoc(shift + _bits, h, key, value)
+            if child is entry:
+                return self, False
+        return _Bitmap(self.bitmap, entries[:i] + (child,) + entries[i + 1:]), added
+
+    def dissoc(self, shift, h, key):
+        """ Returns the node without key, None if it is empty, or self if key is missing.
+            Nodes left with a single leaf are replaced by it in their parent.
+        """
+        bit = 1 << ((h >> shift) & _mask)
+        if not self.bitmap & bit:
+            return self
+        i = _popcount(self.bitmap & (bit - 1))
+        entries = self.entries
+        entry = entries[i]
+        if type(entry) is tuple:
+            if not (entry[0] == h and entry[1] == key):
+                return self
+            child = None
+        else:
+            child = entry.dissoc(shift + _bits, h, key)
+            if child is entry:
+                return self
+            if type(child) is _Bitmap and child.leaf() is not None:
+                child = child.leaf()
+        if child is None:
+            if len(entries) == 1:
+                return None
+            return _Bitmap(self.bitmap ^ bit, entries[:i] + entries[i + 1:])
+        return _Bitmap(self.bitmap, entries[:i] + (child,) + entries[i + 1:])
+
+    def leaf(self):
+        """ Returns the only leaf of the node, or None
+        """
+        if len(self.entries) == 1 and type(self.entries[0]) is tuple:
+            return self.entries[0]
+
+    def leaves(self):
+        for entry in self.entries:
+            if type(entry) is tuple:
+                yield entry
+            else:
+                for leaf in entry.leaves():
+                    yield leaf
+
+
+class _Collision(object):
+    """
+    Node holding the leaves of keys having the same hash
+    """
+    __slots__ = ('hash', 'entries')
+
+    def __init__(self, h, entries):
+        self.hash = h
+        self.entries = entries
+
+    def _find(self, key):
+        for i, entry in enumerate(self.entries):
+            if entry[1] == key:
+                return i
+        return -1
+
+    def get(self, shift, h, key, default):
+        if h == self.hash:
+            i = self._find(key)
+            if i >= 0:
+                return self.entries[i][2]
+        return default
+
+    def assoc(self, shift, h, key, value):
+        if h != self.hash:
+            # the hashes can not differ if the trie is deeper than their bits
+            return _Bitmap(1 << ((self.hash >> shift) & _mask), (self,)).assoc(shift, h, key, value)
+        i = self._find(key)
+        if i < 0:
+            return _Collision(h, self.entries + ((h, key, value),)), True
+        if self.entries[i][2] is value:
+            return self, False
+        return _Collision(h, self.entries[:i] + ((h, key, value),) + self.entries[i + 1:]), False
+
+    def dissoc(self, shift, h, key):
+        i = self._find(key) if h == self.hash else -1
+        if i < 0:
+            return self
+        entries = self.entries[:i] + self.entries[i + 1:]
+        if len(entries) == 1:
+            return entries[0]
+        return _Collision(h, entries)
+
+    def leaves(self):
+        return iter(self.entries)
+
+
+def _pair(shift, leaf1, leaf2):
+    """ Returns the node holding two leaves of different keys
+    """
+    if leaf1[0] == leaf2[0] or shift >= _max_shift:
+        return _Collision(leaf1[0], (leaf1, leaf2))
+    i1, i2 = (leaf1[0] >> shift) & _mask, (leaf2[0] >> shift) & _mask
+    if i1 == i2:
+        return _Bitmap(1 << i1, (_pair(shift + _bits, leaf1, leaf2),))
+    if i1 > i2:
+        leaf1, leaf2 = leaf2, leaf1
+    return _Bitmap((1 << i1) | (1 << i2), (leaf1, leaf2))
+
+
+_empty = _Bitmap(0, ())
+
+
+class pdict(Mapping):
+    """
+    Persistent dict, implemented as a hash array mapped trie (HAMT):
+    instances are immutable, set, remove and the adict operators (+, -, &, add_difference,
+    filter_dict) return new instances sharing all the nodes not on the path of the changed keys,
+    so that changing a key costs O(log32 n) time and memory.
+    Keys must be hashable, and so must be the values for pdicts to be hashable.
+    """
+    _default_value = None
+
+    def __init__(self, *args, **kwargs):
+        """ Same arguments as dict()
+        """
+        root, length = _empty, 0
+        for k, v in dict(*args, **kwargs).iteritems():
+            root, added = root.assoc(0, _hash(k), k, v)
+            length += added
+        self._root = root
+        self._length = length
+        self._hash = None
+
+    @classmethod
+    def _make(cls, root, length):
+        instance = cls.__new__(cls)
+        instance._root = _empty if root is None else root
+        instance._length = length
+        instance._hash = None
+        return instance
+
+    def _assoc_all(self, items, only_new=False):
+        root, length = self._root, self._length
+        for k, v in items:
+            h = _hash(k)
+            if only_new and root.get(0, h, k, _Missing) is not _Missing:
+                continue
+            root, added = root.assoc(0, h, k, v)
+            length += added
+        if root is self._root:
+            return self
+        return self._make(root, length)
+
+    def _dissoc_all(self, keys):
+        root, length = self._root, self._length
+        for k in keys:
+            new = root.dissoc(0, _hash(k), k)
+            if new is not root:
+                root = _empty if new is None else new
+                length -= 1
+        if root is self._root:
+            return self
+        return self._make(root, length)
+
+    def _items(self, iterable):
+        """ Returns the (key, value) pairs of a mapping, or of an iterable of keys with default values
+        """
+        if isinstance(iterable, Mapping):
+            return iterable.iteritems()
+        return ((k, self._default_value) for k in iterable)
+
+    # Mapping API
+
+    def __getitem__(self, key):
+        value = self._root.get(0, _hash(key), key, _Missing)
+        if value is _Missing:
+            raise KeyError(key)
+        return value
+
+    def get(self, key, default=None):
+        return self._root.get(0, _hash(key), key, default)
+
+    def __contains__(self, key):
+        return self._root.get(0, _hash(key), key, _Missing) is not _Missing
+
+    def __len__(self):
+        return self._length
+
+    def __iter__(self):
+        for leaf in self._root.leaves():
+            yield leaf[1]
+
+    iterkeys = __iter__
+
+    def iteritems(self):
+        for leaf in self._root.leaves():
+            yield leaf[1], leaf[2]
+
+    def itervalues(self):
+        for leaf in self._root.leaves():
+            yield leaf[2]
+
+    def __hash__(self):
+        if self._hash is None:
+            self._hash = hash(frozenset(self.iteritems()))
+        return self._hash
+
+    def __repr__(self):
+        return '%s(%r)' % (self.__class__.__name__, dict(self.iteritems()))
+
+    def __reduce__(self):
+        return self.__class__, (dict(self.iteritems()),)
+
+    # immutable methods (return another pdict)
+
+    def set(self, key, value):
+        """ Returns a copy of self with key set to value
+        """
+        return self._assoc_all(((key, value),))
+
+    def update(self, E={}, **F):
+        """ Immutable version of dict.update
+        """
+        return self._assoc_all(self._items(E))._assoc_all(F.iteritems())
+
+    replace = update
+
+    def remove(self, key):
+        """ Returns a copy of self without key, raises KeyError if key is missing
+        """
+        new = self._dissoc_all((key,))
+        if new is self:
+            raise KeyError(key)
+        return new
+
+    def discard(self, key):
+        """ Like remove except it does not raise KeyError exception
+        """
+        return self._dissoc_all((key,))
+
+    def add_difference(self, iterable):
+        """ Returns a copy of self with the keys of iterable that are not in self added,
+            iterable being a mapping or an iterable of keys (their value is _default_value)
+        """
+        return self._assoc_all(self._items(iterable), only_new=True)
+
+    def __add__(self, iterable):
+        """ Returns a copy of self updated with iterable, a mapping or an iterable of keys
+        """
+        return self._assoc_all(self._items(iterable))
+
+    def __sub__(self, iterable):
+        """ Returns a copy of self without the keys of iterable
+        """
+        return self._dissoc_all(iterable)
+
+    def __and__(self, iterable):
+        """ Returns a copy of self restricted to the keys of iterable
+        """
+        if not isinstance(iterable, (Mapping, set, frozenset)):
+            iterable = set(iterable)
+        return self._dissoc_all([k for k in self if k not in iterable])
+
+    def filter_dict(self, f=yesman, negate=False):
+        """ Returns a copy of self filtered by f(key, value)
+        """
+        if negate:
+            return self._dissoc_all([k for k, v in self.iteritems() if f(k, v)])
+        return self._dissoc_all([k for k, v in self.iteritems() if not f(k, v)])
+
+    def reverse(self, duplicate=None):
+        """ reverse the dictionary (exchange keys and values), see adict.reverse
+        """
+        if not duplicate:
+            return self.__class__((v, k) for k, v in self.iteritems())
+        data = ReverseDictFactory.get_dict(duplicate)
+        for k, v in self.iteritems():
+            data[v].add(k, v)
+        return self.__class__((k, v.val()) for k, v in data.iteritems())
+
+    __or__ = __add__
+    __mul__ = __and__
+
+
+def _new_path(level, node):
+    while level:
+        node, level = (node,), level - _bits
+    return node
+
+
+class ptuple(GenericMixin, IndexMixin):
+    """
+    Persistent vector, with the API of atuple: a 32-way trie of the elements, plus a buffer of
+    the last (up to 32) ones, as in Clojure.
+    append, set, + and body return new instances sharing all the nodes not on the path of the
+    changed indexes, in O(log32 n), tail and simple slices to the end are O(1) (the elements
+    before them stay referenced by the new instance).
+    """
+
+    def __init__(self, *args):
+        """ Replacement constructor, admits a single iterable or more than one parameter
+        """
+        items = args[0] if len(args) == 1 and isinstance(args[0], Iterable) else args
+        if not isinstance(items, (tuple, list)):
+            items = tuple(items)
+        count = len(items)
+        tailoff = self._tailoff(count)
+        level = [tuple(items[i:i + _width]) for i in xrange(0, tailoff, _width)]
+        shift = _bits
+        while len(level) > _width:
+            level = [tuple(level[i:i + _width]) for i in xrange(0, len(level), _width)]
+            shift += _bits
+        self._set(count, shift, tuple(level), tuple(items[tailoff:]), 0)
+
+    def _set(self, count, shift, root, buffer, offset):
+        self._count = count
+        self._shift = shift
+        self._root = root
+        self._buffer = buffer
+        self._offset = offset
+
+    def _make(self, count, shift, root, buffer, offset):
+        instance = self.__class__.__new__(self.__class__)
+        instance._set(count, shift, root, buffer, offset)
+        return instance
+
+    @staticmethod
+    def _tailoff(count):
+        return 0 if count < _width else ((count - 1) >> _bits) << _bits
+
+    def _leaf(self, j):
+        """ Returns the node holding the element of physical index j
+        """
+        if j >= self._tailoff(self._count):
+            return self._buffer
+        node = self._root
+        level = self._shift
+        while level > 0:
+            node = node[(j >> level) & _mask]
+            level -= _bits
+        return node
+
+    # trie operations, on physical indexes
+
+    def _push_tail(self, level, parent, leaf):
+        i = ((self._count - 1) >> level) & _mask
+        if level == _bits:
+            child = leaf
+        elif i < len(parent):
+            child = self._push_tail(level - _bits, parent[i], leaf)
+        else:
+            child = _new_path(level - _bits, leaf)
+        return parent[:i] + (child,) + parent[i + 1:]
+
+    def _append(self, x):
+        count, shift, root = self._count, self._shift, self._root
+        if count - self._tailoff(count) < _width:
+            return self._make(count + 1, shift, root, self._buffer + (x,), self._offset)
+        if (count >> _bits) > (1 << shift):
+            root, shift = (root, _new_path(shift, self._buffer)), shift + _bits
+        else:
+            root = self._push_tail(shift, root, self._buffer)
+        return self._make(count + 1, shift, root, (x,), self._offset)
+
+    def _assoc(self, level, node, j, x):
+        i = (j >> level) & _mask
+        if level:
+            x = self._assoc(level - _bits, node[i], j, x)
+        return node[:i] + (x,) + node[i + 1:]
+
+    def _pop_tail(self, level, node):
+        i = ((self._count - 2) >> level) & _mask
+        if level > _bits:
+            child = self._pop_tail(level - _bits, node[i])
+            if child is None:
+                return node[:i] or None
+            return node[:i] + (child,)
+        return node[:i] or None
+
+    # immutable methods (return another ptuple)
+
+    def append(self, x):
+        """ Returns a copy of self with x appended
+        """
+        return self._append(x)
+
+    def set(self, i, x):
+        """ Returns a copy of self with x at index i
+        """
+        j = self._index(i) + self._offset
+        if j >= self._tailoff(self._count):
+            k = j - self._tailoff(self._count)
+            buffer = self._buffer[:k] + (x,) + self._buffer[k + 1:]
+            return self._make(self._count, self._shift, self._root, buffer, self._offset)
+        root = self._assoc(self._shift, self._root, j, x)
+        return self._make(self._count, self._shift, root, self._buffer, self._offset)
+
+    def __add__(self, iterable):
+        """ Returns a copy of self with the elements of iterable appended, sharing the elements of self
+        """
+        result = self
+        for x in iterable:
+            result = result._append(x)
+        return result
+
+    def body(self):
+        """ Returns a copy of self without its last element
+        """
+        count = self._count
+        if count - self._offset <= 1:
+            return self.__class__()
+        if count - self._tailoff(count) > 1:
+            return self._make(count - 1, self._shift, self._root, self._buffer[:-1], self._offset)
+        buffer = self._leaf(count - 2)
+        shift, root = self._shift, self._pop_tail(self._shift, self._root) or ()
+        if shift > _bits and len(root) == 1:
+            shift, root = shift - _bits, root[0]
+        return self._make(count - 1, shift, root, buffer, self._offset)
+
+    def tail(self):
+        """ Returns a copy of self without its first element
+        """
+        if len(self) <= 1:
+            return self.__class__()
+        return self._make(self._count, self._shift, self._root, self._buffer, self._offset + 1)
+
+    # helper methods (return a value)
+
+    def first(self):
+        try:
+            return self[0]
+        except IndexError:
+            pass
+
+    def last(self):
+        try:
+            return self[-1]
+        except IndexError:
+            pass
+
+    def _index(self, i):
+        n = len(self)
+        if i < 0:
+            i += n
+        if not 0 <= i < n:
+            raise IndexError('ptuple index out of range')
+        return i
+
+    def __len__(self):
+        return self._count - self._offset
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            start, stop, step = i.indices(len(self))
+            if step == 1 and stop == len(self):
+                if start >= stop:
+                    return self.__class__()
+                return self._make(self._count, self._shift, self._root, self._buffer, self._offset + start)
+            return self.__class__(self[j] for j in xrange(start, stop, step))
+        j = self._index(i) + self._offset
+        return self._leaf(j)[j & _mask]
+
+    def __iter__(self):
+        start = self._offset
+        for j in xrange(start - (start & _mask), self._tailoff(self._count), _width):
+            leaf = self._leaf(j)
+            for x in (leaf[start - j:] if j < start else leaf):
+                yield x
+        buffer = self._buffer
+        start -= self._tailoff(self._count)
+        for x in (buffer[start:] if start > 0 else buffer):
+            yield x
+
+    def __contains__(self, value):
+        return value in iter(self)
+
+    def index(self, value):
+        for i, x in enumerate(self):
+            if x == value:
+                return i
+        raise ValueError('ptuple.index(x): x not in ptuple')
+
+    def __eq__(self, other):
+        if not isinstance(other, (tuple, ptuple)) or len(self) != len(other):
+            return False
+        return all(imap(eq, self, other))
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash(tuple(self))
+
+    def __repr__(self):
+        return '%s(%r)' % (self.__class__.__name__, tuple(self))
+
+    def __reduce__(self):
+        return self.__class__, (tuple(self),)
@@ -1,8 +1,16 @@
 # -*- coding: utf-8 -*-
 
 import re
+from functools import wraps
+from operator import itemgetter
+from timeit import default_timer
 from version import __version__
 
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
 
 class UnknownOperatorError(ValueError):
     pass
@@ -12,6 +20,26 @@ class UnknownREFlagError(ValueError):
     pass
 
 
+def _coerce(column, t):
+    """ Vectorized equivalent of t(value), does not copy the column if it is already of type t
+    """
+    return column.astype(t, copy=False)
+
+
+def _strings(column, value):
+    """ Returns column as an array of strings of the type of value, suitable for numpy.char
+    """
+    if column.dtype.kind in 'SU':
+        return column
+    return column.astype(type(value))
+
+
+def _inrange(column, value):
+    lo, hi = value
+    column = _coerce(column, type(lo))
+    return (lo <= column) & (column < hi)
+
+
 class RegExp(object):
     """ Implements Regular expressions for searching into containers
     """
@@ -54,16 +82,27 @@ class Where(object):
             Alternatively, you can specify kwargs only, resulting in a single term.
             The '_key_missing_' optional keyword allows to control missing keys behaviour:
             True: missing key behaves like True, False, it behaves like False, None it raises a KeyError
+            Terms of a conjunction are evaluated cheapest operators first. The '_adaptive_' optional
+            keyword gives a number of records to sample, after what terms and conjunctions are
+            reordered according to their observed rejection rates.
+            The '_profile_' optional keyword, if True, makes every evaluation of a term recorded,
+            see profile().
         """
         self.missing = kwargs.pop('_key_missing_', False)
+        self.adaptive = kwargs.pop('_adaptive_', 0)
+        self.profiling = kwargs.pop('_profile_', False)
+        self._profile = {}
         if terms and kwargs:
             raise ValueError("You must specify terms or kwags, not both")
         self.terms = []
         for t in terms:
             self.add_term(t)
         self.add_term(kwargs)
+        self.compile()
 
     def add_term(self, fields):
+        """ Adds a conjunction to the disjunction, recompiling the terms if called after construction
+        """
         if not fields:
             return
         term = []
@@ -84,8 +123,11 @@ class Where(object):
             except KeyError:
                 raise UnknownOperatorError("Operator '%s'" % op)
             term.append((field, op, val))
+        if hasattr(self, 'function'):
+            self.compile()
 
     def missing_manager(func):
+        @wraps(func)
         def wrapped(*args):
             try:
                 return func(*args)
@@ -199,9 +241,213 @@ class Where(object):
         return value(record[field])
 
     def __call__(self, record):
-        return any(
-            all(op(self, record, field, value) for field, op, value in t)
-            for t in self.terms)
+        return self.function(record)
+
+    def compile(self, plan=None):
+        """ Compiles the terms into a single specialized function, stored in self.function.
+            Missing keys behaviour, type coercion and operators dispatch are resolved here,
+            once, instead of for each term of each record.
+            plan is the list of conjunctions in evaluation order, it defaults to the terms,
+            each one sorted by operators cost.
+            Called again by add_term() after construction.
+        """
+        sample = plan is None and self.adaptive
+        if plan is None:
+            plan = [sorted(t, key=lambda term: self.costs[term[1]]) for t in self.terms]
+        self.plan = plan
+        namespace = dict(_once=(None,))
+        source = ['def where(r):']
+        n = 0
+        for t in plan:
+            conditions = []
+            for field, op, value in t:
+                conditions.append((field, self.templates[op], self._bind(namespace, n, op, value)))
+                n += 1
+            source.extend(self._conjunction_source(conditions))
+        source.append('    return False')
+        self.source = '\n'.join(source)
+        exec(compile(self.source, '<where>', 'exec'), namespace)
+        self.function = namespace['where']
+        if self.profiling:
+            self._profiled_terms = [
+                [(self._term_function(field, op, value), self._profile.setdefault((field, op.__name__), [0, 0, 0, 0.]))
+                 for field, op, value in t] for t in plan]
+            self.function = self._profiled
+        if sample:
+            self.replan()
+
+    def replan(self):
+        """ Samples the next '_adaptive_' records, evaluating every term of every conjunction,
+            then recompiles terms sorted by cost / rejection rate, and conjunctions
+            by cost / acceptance rate.
+        """
+        self._evaluate = self.function
+        self._samples = 0
+        self._term_functions = [[self._term_function(*term) for term in t] for t in self.plan]
+        self._passes = [[0] * len(t) for t in self.plan]
+        self._accepted = [0] * len(self.plan)
+        self.function = self._sample
+
+    def _sample(self, record):
+        for functions, passes, i in zip(self._term_functions, self._passes, range(len(self.plan))):
+            accepted = True
+            for j, function in enumerate(functions):
+                try:
+                    passed = function(record)
+                except KeyError:
+                    passed = bool(self.missing)
+                except Exception:
+                    # a term that may never be reached by the compiled function must not raise here
+                    passed = False
+                if passed:
+                    passes[j] += 1
+                else:
+                    accepted = False
+            if accepted:
+                self._accepted[i] += 1
+        self._samples += 1
+        result = self._evaluate(record)
+        if self._samples >= self.adaptive:
+            self._adapt()
+        return result
+
+    def _adapt(self):
+        n = float(self._samples)
+        conjunctions = []
+        for t, passes, accepted in zip(self.plan, self._passes, self._accepted):
+            ranks = [self.costs[op] / max(1 - p / n, 1e-6) for (_, op, _), p in zip(t, passes)]
+            t = [term for _, term in sorted(zip(ranks, t), key=itemgetter(0))]
+            cost = sum(self.costs[op] for _, op, _ in t)
+            conjunctions.append((cost / max(accepted / n, 1e-6), t))
+        del self._evaluate, self._term_functions, self._passes, self._accepted
+        self.compile([t for _, t in sorted(conjunctions, key=itemgetter(0))])
+
+    def _profiled(self, record):
+        """ Evaluates terms one by one, in the order of the plan, recording for each one
+            the number of evaluations, passes, missing keys and the time spent
+        """
+        for t in self._profiled_terms:
+            for function, stats in t:
+                stats[0] += 1
+                start = default_timer()
+                try:
+                    passed = function(record)
+                except KeyError:
+                    stats[2] += 1
+                    if self.missing is None:
+                        stats[3] += default_timer() - start
+                        raise
+                    passed = bool(self.missing)
+                stats[3] += default_timer() - start
+                if not passed:
+                    break
+                stats[1] += 1
+            else:
+                return True
+        return False
+
+    def profile(self):
+        """ Returns the report of a profiling Where: a dict indexed by (field, operator name),
+            of dicts giving the number of evaluations, of passes, of missing keys
+            and the cumulative time (in seconds) spent evaluating the term.
+        """
+        return dict((term, dict(evaluations=stats[0], passes=stats[1], missing=stats[2], time=stats[3]))
+                    for term, stats in self._profile.iteritems())
+
+    def reset_profile(self):
+        for stats in self._profile.itervalues():
+            stats[:] = [0, 0, 0, 0.]
+
+    def __getstate__(self):
+        """ Compiled functions can not be pickled, operators are pickled by name
+        """
+        names = self.operator_names
+        encode = lambda t: [(field, names[op], value) for field, op, value in t]
+        return dict(missing=self.missing, adaptive=self.adaptive, profiling=self.profiling,
+                    terms=map(encode, self.terms), plan=map(encode, self.plan))
+
+    def __setstate__(self, state):
+        decode = lambda t: [(field, self.operators[op], value) for field, op, value in t]
+        self.missing, self.adaptive, self.profiling = state['missing'], state['adaptive'], state['profiling']
+        self._profile = {}
+        self.terms = map(decode, state['terms'])
+        self.compile(map(decode, state['plan']))
+
+    def mask(self, columns):
+        """ Vectorized evaluation on columnar data: columns maps field names to numpy arrays
+            (or sequences) of the same length. Returns a numpy boolean array, True for
+            the rows satisfying self. A missing column behaves like a missing key.
+        """
+        if numpy is None:
+            raise ImportError("Where.mask() requires numpy")
+        size = len(next(columns.itervalues())) if columns else 0
+        result = numpy.zeros(size, bool)
+        for t in self.plan:
+            mask = numpy.ones(size, bool)
+            for field, op, value in t:
+                try:
+                    column = numpy.asarray(columns[field])
+                except KeyError:
+                    if self.missing is None:
+                        raise
+                    if self.missing:
+                        continue
+                    mask[:] = False
+                    break
+                mask &= self.vector_operators[op](column, value)
+            result |= mask
+        return result
+
+    def _term_function(self, field, op, value):
+        """ Compiles a single term, missing keys raise a KeyError
+        """
+        namespace = {}
+        test = self.templates[op] % dict(self._bind(namespace, 0, op, value), v='r[%r]' % field)
+        exec(compile('def term(r):\n    return bool(%s)' % test, '<where term>', 'exec'), namespace)
+        return namespace['term']
+
+    def _bind(self, namespace, n, op, value):
+        """ Stores the constants of the nth term into namespace,
+            returns the names to be substituted in the operator template
+        """
+        names = dict(c='c%d' % n, t='t%d' % n, lo='lo%d' % n, hi='hi%d' % n)
+        if op is self.operators['search']:
+            namespace[names['c']] = value.re.match if value.match else value.re.search
+        elif op in (self.operators['inrange'], self.operators['notinrange']):
+            lo, hi = value
+            assert type(lo) is type(hi)
+            namespace.update({names['lo']: lo, names['hi']: hi, names['t']: type(lo)})
+        else:
+            namespace.update({names['c']: value, names['t']: type(value)})
+        return names
+
+    def _conjunction_source(self, conditions):
+        """ Returns the source lines evaluating a conjunction, according to missing keys behaviour
+        """
+        if self.missing is None or not self.missing:
+            test = ' and '.join('(%s)' % (template % dict(names, v='r[%r]' % field))
+                                for field, template, names in conditions)
+            if self.missing is None:
+                return ['    if %s:' % test,
+                        '        return True']
+            # a missing key behaves like False, so it fails the whole conjunction
+            return ['    try:',
+                    '        if %s:' % test,
+                    '            return True',
+                    '    except KeyError:',
+                    '        pass']
+        # a missing key behaves like True, so each term has to handle its own KeyError
+        lines = ['    for _ in _once:']
+        for field, template, names in conditions:
+            lines.extend(['        try:',
+                          '            v = r[%r]' % field,
+                          '        except KeyError:',
+                          '            pass',
+                          '        else:',
+                          '            if not (%s):' % (template % dict(names, v='v')),
+                          '                break'])
+        lines.append('        return True')
+        return lines
 
     operators = dict(
         equals=equals, eq=equals,
@@ -225,3 +471,71 @@ class Where(object):
         notiendswith=notiendswith, niend=notiendswith,
         search=regexp, match=regexp,
     )
+    operator_names = dict((op, name) for name, op in operators.iteritems())
+
+    # source templates used by compile(): v is the field value, c the compared value,
+    # t its type (used for coercion), lo and hi the bounds of a range
+    templates = {
+        equals: '%(t)s(%(v)s) == %(c)s',
+        notequals: '%(t)s(%(v)s) != %(c)s',
+        gt: '%(t)s(%(v)s) > %(c)s',
+        gte: '%(t)s(%(v)s) >= %(c)s',
+        lt: '%(t)s(%(v)s) < %(c)s',
+        lte: '%(t)s(%(v)s) <= %(c)s',
+        inrange: '%(lo)s <= %(t)s(%(v)s) < %(hi)s',
+        notinrange: 'not %(lo)s <= %(t)s(%(v)s) < %(hi)s',
+        iequals: '%(v)s.lower() == %(c)s',
+        notiequals: '%(v)s.lower() != %(c)s',
+        contains: '%(c)s in %(v)s',
+        notcontains: '%(c)s not in %(v)s',
+        icontains: '%(c)s in %(v)s.lower()',
+        noticontains: '%(c)s not in %(v)s.lower()',
+        startswith: '%(v)s.startswith(%(c)s)',
+        notstartswith: 'not %(v)s.startswith(%(c)s)',
+        istartswith: '%(v)s.lower().startswith(%(c)s)',
+        notistartswith: 'not %(v)s.lower().startswith(%(c)s)',
+        endswith: '%(v)s.endswith(%(c)s)',
+        notendswith: 'not %(v)s.endswith(%(c)s)',
+        iendswith: '%(v)s.lower().endswith(%(c)s)',
+        notiendswith: 'not %(v)s.lower().endswith(%(c)s)',
+        regexp: '%(c)s(%(v)s)',
+    }
+
+    # vectorized operators used by mask(), taking a numpy array and the compared value
+    vector_operators = {
+        equals: lambda c, v: _coerce(c, type(v)) == v,
+        notequals: lambda c, v: _coerce(c, type(v)) != v,
+        gt: lambda c, v: _coerce(c, type(v)) > v,
+        gte: lambda c, v: _coerce(c, type(v)) >= v,
+        lt: lambda c, v: _coerce(c, type(v)) < v,
+        lte: lambda c, v: _coerce(c, type(v)) <= v,
+        inrange: lambda c, v: _inrange(c, v),
+        notinrange: lambda c, v: ~_inrange(c, v),
+        iequals: lambda c, v: numpy.char.lower(_strings(c, v)) == v,
+        notiequals: lambda c, v: numpy.char.lower(_strings(c, v)) != v,
+        contains: lambda c, v: numpy.char.find(_strings(c, v), v) >= 0,
+        notcontains: lambda c, v: numpy.char.find(_strings(c, v), v) < 0,
+        icontains: lambda c, v: numpy.char.find(numpy.char.lower(_strings(c, v)), v) >= 0,
+        noticontains: lambda c, v: numpy.char.find(numpy.char.lower(_strings(c, v)), v) < 0,
+        startswith: lambda c, v: numpy.char.startswith(_strings(c, v), v),
+        notstartswith: lambda c, v: ~numpy.char.startswith(_strings(c, v), v),
+        istartswith: lambda c, v: numpy.char.startswith(numpy.char.lower(_strings(c, v)), v),
+        notistartswith: lambda c, v: ~numpy.char.startswith(numpy.char.lower(_strings(c, v)), v),
+        endswith: lambda c, v: numpy.char.endswith(_strings(c, v), v),
+        notendswith: lambda c, v: ~numpy.char.endswith(_strings(c, v), v),
+        iendswith: lambda c, v: numpy.char.endswith(numpy.char.lower(_strings(c, v)), v),
+        notiendswith: lambda c, v: ~numpy.char.endswith(numpy.char.lower(_strings(c, v)), v),
+        regexp: lambda c, v: numpy.fromiter((bool(v(x)) for x in c), bool, len(c)),
+    }
+
+    # static cost of operators: equality first, then ranges, then string scans, then regexps
+    costs = {
+        equals: 1, notequals: 1,
+        iequals: 2, notiequals: 2,
+        gt: 3, gte: 3, lt: 3, lte: 3, inrange: 3, notinrange: 3,
+        startswith: 4, notstartswith: 4, endswith: 4, notendswith: 4,
+        istartswith: 5, notistartswith: 5, iendswith: 5, notiendswith: 5,
+        contains: 6, notcontains: 6,
+        icontains: 7, noticontains: 7,
+        regexp: 10,
+    }
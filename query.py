@@ -0,0 +1,220 @@
+# -*- coding: utf-8 -*-
+
+"""
+LINQ-like queries over containers, see http://en.wikipedia.org/wiki/Language_Integrated_Query
+A query records its steps, nothing is evaluated before it is iterated.
+Consecutive streaming steps (select, where, distinct, skip, take) are fused into a single
+generated generator, so that no intermediate container is built between them.
+Blocking steps (order_by, group_by) consume their input entirely, they split the plan in segments.
+"""
+
+from collections import OrderedDict
+from heapq import nlargest, nsmallest
+
+from predicates import Where
+
+streaming = ('select', 'where', 'distinct', 'skip', 'take')
+
+
+def identity(x):
+    return x
+
+
+def _limit(steps):
+    """ Returns the number of elements the leading skip and take steps of steps may let through,
+        or None if they do not limit it
+    """
+    offset, limit = 0, None
+    for step in steps:
+        if step[0] == 'skip':
+            offset += max(step[1], 0)
+        elif step[0] == 'take':
+            n = offset + max(step[1], 0)
+            limit = n if limit is None else min(limit, n)
+        else:
+            break
+    return limit
+
+
+def _segment_function(steps):
+    """ Compiles a sequence of streaming steps into a generator function of an iterable.
+        Filtering steps nest the following ones, so that the takes can be checked at the end
+        of each loop, right after the element that exhausted them.
+    """
+    namespace = {}
+    source = ['def segment(_iterable):']
+    takes = []
+    for n, step in enumerate(steps):
+        if step[0] == 'skip':
+            namespace['skip%d' % n] = step[1]
+            source.append('    s%d = 0' % n)
+        elif step[0] == 'distinct':
+            namespace['key%d' % n] = step[1]
+            source.append('    seen%d = set()' % n)
+        elif step[0] == 'take':
+            namespace['take%d' % n] = step[1]
+            source.append('    if take%d <= 0: return' % n)
+            source.append('    t%d = 0' % n)
+            takes.append(n)
+        else:
+            namespace['f%d' % n] = step[1]
+    source.append('    for x in _iterable:')
+    indent = ' ' * 8
+    for n, step in enumerate(steps):
+        op = step[0]
+        if op == 'select':
+            source.append('%sx = f%d(x)' % (indent, n))
+        elif op == 'where':
+            source.append('%sif f%d(x):' % (indent, n))
+            indent += '    '
+        elif op == 'distinct':
+            source.append('%sk = key%d(x)' % (indent, n))
+            source.append('%sif k not in seen%d:' % (indent, n))
+            indent += '    '
+            source.append('%sseen%d.add(k)' % (indent, n))
+        elif op == 'skip':
+            source.append('%sif s%d < skip%d:' % (indent, n, n))
+            source.append('%s    s%d += 1' % (indent, n))
+            source.append('%selse:' % indent)
+            indent += '    '
+        else:
+            source.append('%st%d += 1' % (indent, n))
+    source.append('%syield x' % indent)
+    for n in takes:
+        source.append('        if t%d >= take%d: return' % (n, n))
+    source = '\n'.join(source)
+    exec(compile(source, '<query>', 'exec'), namespace)
+    return namespace['segment'], source
+
+
+def _groups(iterable, key):
+    groups = OrderedDict()
+    for x in iterable:
+        k = key(x)
+        try:
+            groups[k].append(x)
+        except KeyError:
+            groups[k] = [x]
+    return groups.iteritems()
+
+
+class Query(object):
+    """
+    Query over the elements of a source, built by chaining select, where, order_by, take, skip,
+    distinct and group_by, then evaluated by iterating it or with materialize, first and count.
+    Each step returns a new query, a query can be iterated several times,
+    it reflects the current state of its source.
+    """
+
+    def __init__(self, source, constructor=list, steps=()):
+        """ source is a callable returning an iterator over the elements,
+            constructor builds a container from an iterable (see materialize)
+        """
+        self._source = source
+        self._constructor = constructor
+        self._steps = tuple(steps)
+        self._plan = None
+
+    def _push(self, *step):
+        return self.__class__(self._source, self._constructor, self._steps + (step,))
+
+    def __repr__(self):
+        return '%s(%s)' % (self.__class__.__name__, ', '.join(step[0] for step in self._steps))
+
+    # steps (return another query)
+
+    def select(self, f):
+        """ Maps the elements with f
+        """
+        return self._push('select', f)
+
+    def where(self, f=None, **kwargs):
+        """ Retains the elements satisfying f, or Where(**kwargs) if f is None
+        """
+        return self._push('where', Where(**kwargs) if f is None else f)
+
+    def distinct(self, key=identity):
+        """ Retains the first element of each key, keys must be hashable
+        """
+        return self._push('distinct', key)
+
+    def skip(self, n):
+        """ Drops the first n elements
+        """
+        return self._push('skip', n)
+
+    def take(self, n):
+        """ Retains the first n elements, the source is not iterated any further
+        """
+        return self._push('take', n)
+
+    def order_by(self, key=identity, reverse=False):
+        """ Sorts the elements (stable sort). When followed by take, only the retained elements
+            are sorted.
+        """
+        return self._push('order_by', key, reverse)
+
+    def group_by(self, key):
+        """ Groups the elements by key, giving (key, list of elements) pairs in order of first occurrence
+        """
+        return self._push('group_by', key)
+
+    # evaluation
+
+    def plan(self):
+        """ Returns the execution plan, a list of functions of an iterable returning an iterable,
+            each one being a fused segment of streaming steps or a blocking step.
+            The source of the fused segments is kept in their 'source' attribute.
+        """
+        if self._plan is None:
+            plan, segment = [], []
+            for i, step in enumerate(self._steps):
+                if step[0] in streaming:
+                    segment.append(step)
+                    continue
+                if segment:
+                    plan.append(self._fuse(segment))
+                    segment = []
+                if step[0] == 'group_by':
+                    plan.append(lambda iterable, key=step[1]: _groups(iterable, key))
+                    continue
+                limit = _limit(self._steps[i + 1:])
+                if limit is None:
+                    plan.append(lambda iterable, key=step[1], reverse=step[2]:
+                                iter(sorted(iterable, key=key, reverse=reverse)))
+                else:
+                    plan.append(lambda iterable, key=step[1], n=limit, top=nlargest if step[2] else nsmallest:
+                                iter(top(n, iterable, key=key)))
+            if segment:
+                plan.append(self._fuse(segment))
+            self._plan = plan
+        return self._plan
+
+    @staticmethod
+    def _fuse(segment):
+        function, source = _segment_function(segment)
+        function.source = source
+        return function
+
+    def __iter__(self):
+        iterator = self._source()
+        for function in self.plan():
+            iterator = function(iterator)
+        return iterator
+
+    def materialize(self, constructor=None):
+        """ Returns a container of the elements, of the class of the query source by default
+        """
+        return (constructor or self._constructor)(iter(self))
+
+    def first(self, default=None):
+        """ Returns the first element, or default if there is none
+        """
+        for x in self.take(1):
+            return x
+        return default
+
+    def count(self):
+        """ Returns the number of elements
+        """
+        return sum(1 for _ in self)
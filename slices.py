@@ -0,0 +1,201 @@
+# -*- coding: utf-8 -*-
+
+"""
+Slice views: slicing an atuple or an alist returns a view on its elements (start, step, length)
+instead of a copy, so that slicing is O(1) whatever the size of the slice.
+Views have the helpers of GenericMixin and IndexMixin, and are materialized into the class
+of the sliced sequence with materialize(), or when pickled, concatenated, repeated or compared.
+Full slices (s[:]) are not views: they return the atuple itself, or a copy of the alist.
+"""
+
+from itertools import imap, islice, repeat
+
+from mixins import GenericMixin, IndexMixin
+
+
+def _materialized(sequence):
+    return sequence.materialize() if isinstance(sequence, SliceView) else sequence
+
+
+class SliceView(GenericMixin, IndexMixin):
+    """
+    Read only view on a slice of a sequence (the parent)
+    """
+
+    def __init__(self, parent, start, step, length):
+        self._parent = parent
+        self._start = start
+        self._step = step
+        self._length = length
+        self._item = tuple.__getitem__ if isinstance(parent, tuple) else list.__getitem__
+
+    @classmethod
+    def of(cls, parent, index):
+        """ Returns the view on parent[index], index being a slice
+        """
+        start, stop, step = index.indices(len(parent))
+        return cls(parent, start, step, len(xrange(start, stop, step)))
+
+    @property
+    def _filter_constructor(self):
+        return type(self._parent)
+
+    def materialize(self):
+        """ Returns a copy of the elements, of the class of the sliced sequence
+        """
+        return type(self._parent)(iter(self))
+
+    def _indices(self):
+        return xrange(self._start, self._start + len(self) * self._step, self._step)
+
+    def __len__(self):
+        return self._length
+
+    def __iter__(self):
+        return imap(self._item, repeat(self._parent), self._indices())
+
+    def __reversed__(self):
+        return imap(self._item, repeat(self._parent), reversed(self._indices()))
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            start, stop, step = i.indices(len(self))
+            return self.__class__(self._parent, self._start + start * self._step, self._step * step,
+                                  len(xrange(start, stop, step)))
+        n = len(self)
+        if i < 0:
+            i += n
+        if not 0 <= i < n:
+            raise IndexError('%s index out of range' % self.__class__.__name__)
+        return self._item(self._parent, self._start + i * self._step)
+
+    def __contains__(self, value):
+        return value in iter(self)
+
+    def index(self, value, start=0, stop=None):
+        start, stop, _ = slice(start, stop).indices(len(self))
+        for i, x in enumerate(islice(iter(self), start, stop), start):
+            if x == value:
+                return i
+        raise ValueError('%r is not in %s' % (value, self.__class__.__name__))
+
+    def __eq__(self, other):
+        return self.materialize() == _materialized(other)
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __add__(self, iterable):
+        return self.materialize() + iterable
+
+    def __radd__(self, sequence):
+        return sequence + self.materialize()
+
+    def __mul__(self, n):
+        return self.materialize() * n
+
+    __rmul__ = __mul__
+
+    def __lt__(self, other):
+        return self.materialize() < _materialized(other)
+
+    def __le__(self, other):
+        return self.materialize() <= _materialized(other)
+
+    def __gt__(self, other):
+        return self.materialize() > _materialized(other)
+
+    def __ge__(self, other):
+        return self.materialize() >= _materialized(other)
+
+    def __repr__(self):
+        return '%s(%r)' % (self.__class__.__name__, self.materialize())
+
+    def __reduce__(self):
+        return type(self._parent), (tuple(self),)
+
+
+class TupleView(SliceView):
+    """
+    View on a slice of an atuple, with the atuple API
+    """
+
+    def __hash__(self):
+        return hash(tuple(self))
+
+    def last(self):
+        try:
+            return self[-1]
+        except IndexError:
+            pass
+
+    def body(self):
+        return self[:-1]
+
+    def first(self):
+        try:
+            return self[0]
+        except IndexError:
+            pass
+
+    def tail(self):
+        return self[1:]
+
+
+def _mutator(name):
+    def method(self, *args, **kwargs):
+        if not self._owned:
+            self._own()
+        result = getattr(self._parent, name)(*args, **kwargs)
+        return self if result is self._parent else result
+    method.__name__ = name
+    method.__doc__ = """ Copies the elements of the view if they are still shared, then applies %s
+        """ % name
+    return method
+
+
+class ListView(SliceView):
+    """
+    Copy on write view on a slice of an alist: the first mutation of the view, or of the sliced
+    list, gives the view its own copy of the elements (an instance of the class of the sliced list),
+    so that views behave like the copies list slices are.
+    """
+    __hash__ = None
+
+    def __init__(self, parent, start, step, length):
+        SliceView.__init__(self, parent, start, step, length)
+        self._owned = False
+        parent._add_view(self)
+
+    def _own(self):
+        """ Copies the elements, called by the sliced list before it is mutated
+        """
+        self._parent = type(self._parent)(iter(self))
+        self._start, self._step = 0, 1
+        self._owned = True
+
+    def __len__(self):
+        return len(self._parent) if self._owned else self._length
+
+    # mutable methods (return self)
+
+    clear = _mutator('clear')
+    append = _mutator('append')
+    extend = _mutator('extend')
+    insert = _mutator('insert')
+    remove = _mutator('remove')
+    remove_all = _mutator('remove_all')
+    remove_index = _mutator('remove_index')
+    remove_slice = _mutator('remove_slice')
+    discard = _mutator('discard')
+    discard_all = _mutator('discard_all')
+    discard_index = _mutator('discard_index')
+    discard_slice = _mutator('discard_slice')
+    pop = _mutator('pop')
+    reverse = _mutator('reverse')
+    sort = _mutator('sort')
+    __setitem__ = _mutator('__setitem__')
+    __delitem__ = _mutator('__delitem__')
+    __iadd__ = _mutator('__iadd__')
+    __isub__ = _mutator('__isub__')
+    __imul__ = _mutator('__imul__')
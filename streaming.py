@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+
+"""
+Streams the records of JSON Lines files, filtered by Where predicates.
+Files are memory mapped, and lines that can not contain the literals required by the Where
+are skipped without being decoded.
+Literals are searched raw, this assumes that the JSON encoder did not escape printable ascii
+characters, which is the behaviour of usual encoders.
+"""
+
+import json
+import mmap
+import re
+
+from predicates import Where
+
+operators = Where.operators
+
+# printable ascii without '"', '/' and '\', ie characters that usual JSON encoders never escape
+_unescaped = re.compile(r'[ !#-.0-\[\]-~]+$')
+
+
+def _literal(value):
+    """ Returns value as raw bytes, or None if it may be escaped in JSON
+    """
+    if isinstance(value, basestring) and _unescaped.match(value):
+        return value.encode('ascii')
+
+
+def _equals_literal(value):
+    """ Returns the literal that must be in the line for type(value)(field) == value to hold,
+        excluding values that could result from the coercion of floats, booleans, null,
+        lists or objects, whose string representation differs from their JSON encoding
+    """
+    if value in ('True', 'False', 'None') or value[:1] in ('[', '{'):
+        return
+    try:
+        float(value)
+    except ValueError:
+        return _literal(value)
+    if value.lstrip('-').isdigit():
+        return _literal(value)
+
+
+def literals(where):
+    """ Returns, for each conjunction of where, the list of byte strings that a line must contain
+        to possibly satisfy it, or None if where can not be prefiltered.
+        Only 'eq', 'contains' and 'startswith' terms give literals, along with field names,
+        and only when missing keys behave like False.
+    """
+    if where.missing is None or where.missing:
+        return
+    conjunctions = []
+    for t in where.terms:
+        found = []
+        for field, op, value in t:
+            name = _literal(field)
+            if name:
+                found.append(b'"' + name + b'"')
+            if not isinstance(value, basestring):
+                continue
+            if op is operators['eq']:
+                found.append(_equals_literal(value))
+            elif op in (operators['contains'], operators['startswith']):
+                found.append(_literal(value))
+        found = [literal for literal in found if literal]
+        if not found:
+            return
+        conjunctions.append(found)
+    return conjunctions
+
+
+def _lines(data):
+    pos, size = 0, len(data)
+    while pos < size:
+        end = data.find(b'\n', pos)
+        if end < 0:
+            end = size
+        yield data[pos:end]
+        pos = end + 1
+
+
+def _anchored_lines(data, anchor, others):
+    """ Jumps from an occurrence of anchor to the next one, yielding the lines containing it
+        and all the others literals
+    """
+    pos, size = 0, len(data)
+    while pos < size:
+        i = data.find(anchor, pos)
+        if i < 0:
+            return
+        start = max(data.rfind(b'\n', pos, i) + 1, pos)
+        end = data.find(b'\n', i)
+        if end < 0:
+            end = size
+        line = data[start:end]
+        if all(literal in line for literal in others):
+            yield line
+        pos = end + 1
+
+
+def _candidate_lines(data, conjunctions):
+    if not conjunctions:
+        return _lines(data)
+    if len(conjunctions) == 1:
+        found = sorted(conjunctions[0], key=len)
+        return _anchored_lines(data, found.pop(), found)
+    return (line for line in _lines(data)
+            if any(all(literal in line for literal in found) for found in conjunctions))
+
+
+def iter_jsonl(filename, where=None):
+    """ Yields the records of a JSON Lines file satisfying where, or all of them if where is None.
+        Memory usage does not depend on the size of the file.
+    """
+    with open(filename, 'rb') as f:
+        try:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # empty files can not be mapped
+            return
+        try:
+            conjunctions = None if where is None else literals(where)
+            for line in _candidate_lines(data, conjunctions):
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                if where is None or where(record):
+                    yield record
+        finally:
+            data.close()
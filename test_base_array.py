@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+
+import os
+import pickle
+import tempfile
+import unittest
+
+from base_array import aarray
+from predicates import numpy
+
+
+class ArrayTestCase(unittest.TestCase):
+
+    def test_constructor(self):
+        self.assertListEqual(aarray('d', [1, 2]).tolist(), [1., 2.])
+        self.assertListEqual(aarray('d', 1, 2).tolist(), [1., 2.])
+        self.assertListEqual(aarray('l', (x for x in range(3))).tolist(), [0, 1, 2])
+        self.assertEqual(aarray('d').itemsize, 8)
+        self.assertEqual(aarray('f').itemsize, 4)
+
+    def test_mutations(self):
+        a = aarray('l', 3, 1, 2)
+        self.assertListEqual(a.append(5).extend([4, 1]).insert(0, 0).tolist(), [0, 3, 1, 2, 5, 4, 1])
+        self.assertListEqual(a.remove(1).discard(9).discard_all([4, 9]).remove_all([0]).tolist(), [3, 2, 5, 1])
+        self.assertListEqual(a.sort().tolist(), [1, 2, 3, 5])
+        self.assertEqual(a.index_b(3), 2)
+        self.assertListEqual(a.sort(reverse=True).reverse().tolist(), [1, 2, 3, 5])
+        a += [6]
+        a -= [1]
+        self.assertListEqual(a.tolist(), [2, 3, 5, 6])
+        self.assertListEqual((a + [7]).tolist(), [2, 3, 5, 6, 7])
+        self.assertListEqual((a - [3, 6]).tolist(), [2, 5])
+        self.assertEqual(type(a + [7]), aarray)
+        self.assertListEqual(a.clear().tolist(), [])
+        self.assertRaises(TypeError, a.append, 1.5)
+
+    def test_filter(self):
+        a = aarray('d', range(6))
+        self.assertEqual(type(a.filter()), aarray)
+        self.assertEqual(a.filter().typecode, 'd')
+        self.assertListEqual(a.filter(lambda x: x > 3).tolist(), [4., 5.])
+        self.assertListEqual(a.filter_index(lambda i, x: i % 2).tolist(), [1., 3., 5.])
+        self.assertEqual(a.filter_index(lambda i, x: i % 2).typecode, 'd')
+        self.assertEqual(a.count(), 5)
+        self.assertEqual(a.count(lambda x: x > 1), 4)
+        self.assertEqual(a.sum(), 15)
+        self.assertEqual(a.first(lambda x: x > 2), 3.)
+
+    def test_buffer(self):
+        a = aarray('d', range(4))
+        fd, filename = tempfile.mkstemp()
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                a.tofile(f)
+            self.assertEqual(os.path.getsize(filename), 4 * 8)
+        finally:
+            os.remove(filename)
+        self.assertEqual(pickle.loads(pickle.dumps(a)), a)
+
+    @unittest.skipIf(numpy is None, 'numpy is not installed')
+    def test_numpy(self):
+        a = aarray('d', range(4))
+        n = numpy.frombuffer(a, a.typecode)
+        self.assertListEqual(n.tolist(), a.tolist())
+        a[0] = 7
+        self.assertEqual(n[0], 7)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+
+import pickle
+import unittest
+
+from base_dict import adict, bdict, DuplicateValueError
+
+
+class BidirectionalDictTestCase(unittest.TestCase):
+
+    def check(self, d):
+        inverse = {}
+        for k, v in d.iteritems():
+            inverse.setdefault(v, set()).add(k)
+        self.assertDictEqual(d._inverse, inverse)
+
+    def test_mutations(self):
+        d = bdict(a=1, b=2, c=1)
+        self.check(d)
+        self.assertEqual(d.keys_for(1), {'a', 'c'})
+        self.assertEqual(d.keys_for(3), set())
+        d['a'] = 2
+        d['c'] = 1
+        self.check(d)
+        self.assertEqual(d.count_of(2), 2)
+        self.assertIs(d.update([('d', 4)], e=5).replace({'d': 1}), d)
+        self.check(d)
+        d.remove('a').discard_all('bz').project('cde')
+        self.check(d)
+        self.assertDictEqual(d, {'c': 1, 'd': 1, 'e': 5})
+        self.assertEqual(d.pop('e'), 5)
+        self.assertEqual(d.pop('e', 0), 0)
+        self.assertEqual(d.setdefault('f', 6), 6)
+        d.popitem()
+        d += 'xy'
+        d -= 'x'
+        d &= 'cdfy'
+        self.check(d)
+        self.assertRaises(TypeError, d.__setitem__, 'c', [])
+        self.check(d)
+        self.assertEqual(len(d.clear()._inverse), 0)
+
+    def test_immutable(self):
+        d = bdict(a=1, b=2, c=1)
+        for dd in (d + {'d': 3}, d - 'a', d & 'ab', d.add_difference('bz'), pickle.loads(pickle.dumps(d))):
+            self.assertIsInstance(dd, bdict)
+            self.check(dd)
+        self.check(d)
+
+    def test_reverse(self):
+        d = bdict(a=1, b=2, c=3, d=4)
+        self.assertDictEqual(d.reverse(), {1: 'a', 2: 'b', 3: 'c', 4: 'd'})
+        self.assertIsInstance(d.reverse(), adict)
+        self.assertDictEqual(d.reverse('raise'), d.reverse())
+        d['e'] = 1
+        self.assertIn(d.reverse()[1], ('a', 'e'))
+        self.assertRaises(DuplicateValueError, d.reverse, 'raise')
+        self.assertDictEqual(d.reverse('count'), {1: 2, 2: 1, 3: 1, 4: 1})
+        self.assertEqual(sorted(d.reverse('list')[1]), ['a', 'e'])
+        self.assertDictEqual(d.reverse('count'), adict(d).reverse('count'))
+
+
+if __name__ == '__main__':
+    unittest.main()
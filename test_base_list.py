@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+
+import pickle
+import random
+import unittest
+
+from base_list import alist, slist
+
+
+class ListTestCase(unittest.TestCase):
+
+    def test_bulk_removal(self):
+        l = alist(range(20) * 2)
+        self.assertListEqual(l - range(0, 20, 2), range(1, 20, 2) * 2)
+        self.assertRaises(ValueError, l.remove_all, range(15, 30))
+        self.assertListEqual(l.remove_all(range(15) * 2), range(15, 20) * 2)
+        self.assertListEqual(l.discard_all(range(15, 30)), range(15, 20))
+        l -= [19]
+        self.assertListEqual(l, range(15, 19))
+        # strings search substrings, they are not replaced by a set of their characters
+        self.assertListEqual(alist(['ab', 'c', 'd']) - 'abc', ['d'])
+        self.assertListEqual(slist(['ab', 'c', 'd']) - 'abc', ['d'])
+        # unhashable elements
+        self.assertListEqual(alist([1], 2) - [3], [[1], 2])
+        self.assertListEqual(alist([1], 2) - [[1]], [2])
+
+
+class SortedListTestCase(unittest.TestCase):
+
+    def test_order(self):
+        values = range(100)
+        random.shuffle(values)
+        l = slist(values[:50])
+        self.assertListEqual(l, sorted(values[:50]))
+        l.append(values[50]).insert(0, values[51]).extend(values[52:55]).extend(values[55:])
+        self.assertListEqual(l, range(100))
+        l += [3, 3]
+        self.assertListEqual(l[:6], [0, 1, 2, 3, 3, 3])
+        l.remove(3).discard(3).discard(1000).remove_all([0, 99]).discard_all([1, 1000])
+        self.assertListEqual(l[:3], [2, 3, 4])
+        self.assertEqual(l.pop(), 98)
+        del l[:2]
+        self.assertListEqual(l[:2], [4, 5])
+        self.assertRaises(ValueError, l.remove, 2)
+        self.assertRaises(TypeError, l.__setitem__, 0, 1)
+        self.assertRaises(TypeError, l.__setslice__, 0, 1, [1])
+        self.assertRaises(TypeError, l.reverse)
+        self.assertRaises(TypeError, l.sort, reverse=True)
+        self.assertIs(l.sort(), l)
+        self.assertEqual(type(l + [1]), slist)
+        self.assertListEqual((slist(3, 1) + [2])[:], [1, 2, 3])
+        l = slist(2, 1)
+        l *= 2
+        self.assertListEqual(l, [1, 1, 2, 2])
+
+    def test_search(self):
+        l = slist(5, 1, 3, 3, 9, 7)
+        self.assertIn(3, l)
+        self.assertNotIn(4, l)
+        self.assertEqual(l.index(3), 1)
+        self.assertEqual(l.index(3, 2), 2)
+        self.assertRaises(ValueError, l.index, 3, 3)
+        self.assertEqual(l.count(3), 2)
+        self.assertEqual(l.count(4), 0)
+        self.assertEqual(l.rank(3), 1)
+        self.assertEqual(l.rank(4), 3)
+        self.assertListEqual(l.range(3, 7), [3, 3, 5])
+        self.assertListEqual(l.range(hi=3), [1])
+        self.assertListEqual(l.range(8), [9])
+
+    def test_key(self):
+        scores = [('bob', 12), ('alice', 40), ('carol', 12), ('dave', 25)]
+        l = slist(scores, key=lambda score: -score[1])
+        self.assertListEqual([name for name, _ in l], ['alice', 'dave', 'bob', 'carol'])
+        l.append(('eve', 12)).extend([('zoe', 50)])
+        self.assertListEqual([name for name, _ in l], ['zoe', 'alice', 'dave', 'bob', 'carol', 'eve'])
+        self.assertIn(('carol', 12), l)
+        self.assertNotIn(('carol', 13), l)
+        self.assertEqual(l.index(('carol', 12)), 4)
+        self.assertEqual(l.count(('eve', 12)), 1)
+        self.assertEqual(l.rank(('x', 25)), 2)
+        self.assertListEqual(l.range(-40, -12), [('alice', 40), ('dave', 25)])
+        l.remove(('bob', 12))
+        del l[0]
+        self.assertListEqual(l._keys, [-40, -25, -12, -12])
+        self.assertListEqual((l - [('dave', 25)])._keys, [-40, -12, -12])
+        self.assertRaises(TypeError, slist, [], cmp=None)
+
+    def test_pickle(self):
+        l = pickle.loads(pickle.dumps(slist(3, 1, 2), 2))
+        self.assertListEqual(l, [1, 2, 3])
+        self.assertIn(2, l)
+
+
+if __name__ == '__main__':
+    unittest.main()
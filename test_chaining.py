@@ -2,7 +2,8 @@
 
 import unittest
 
-from chaining import Chain, ArturoChain, HistoryChain
+from chaining import Chain, ArturoChain, HistoryChain, DeltaHistoryChain, DeferredChain, delta, _optimize
+from fcontainers import flist, ftuple
 
 
 class toto(object):
@@ -61,6 +62,26 @@ class ChainTestCase(unittest.TestCase):
         self.assertIsInstance(cc, Chain)
         self.assertIsNot(cc, c)
 
+    def test_dispatch(self):
+        c = Chain([])
+        self.assertRaises(AttributeError, setattr, c, 'x', 1)
+        self.assertEqual(repr(c.append(1)), 'Chain([1])')
+        # wrappers are set on the class of the chain, per class of the wrapped object
+        self.assertIn('append', type(c).__dict__)
+        self.assertIs(type(Chain([2])), type(c))
+        self.assertIsNot(type(Chain(flist())), type(c))
+        self.assertRaises(TypeError, lambda: c + [1])
+        self.assertListEqual(c.__iadd__([2]).object, [1, 2])
+        # instance attributes and objects replaced by a subclass instance
+        o = toto()
+        o.e = lambda: 1
+        self.assertEqual(Chain(o).e(), 1)
+        c = ArturoChain([3, 2, 1])
+        c.object = flist(c.object)
+        self.assertIs(c.sort(), c)
+        self.assertIs(c.filter(lambda x: x > 1), c)
+        self.assertListEqual(c.object, [2, 3])
+
 
 class ArturoChainTestCase(unittest.TestCase):
 
@@ -82,5 +103,98 @@ class HistoryChainTestCase(unittest.TestCase):
         self.assertIs(cc.backward().object, o)
 
 
+class DeltaHistoryChainTestCase(unittest.TestCase):
+
+    def test_immutable_d(self):
+        o = toto()
+        c = DeltaHistoryChain(o)
+        cc = c.d()
+        self.assertIs(cc, c)
+        self.assertIsNot(cc.object, o)
+        self.assertIs(cc.backward().object, o)
+        self.assertRaises(IndexError, c.backward)
+
+    def test_list(self):
+        l = flist(range(1000))
+        c = DeltaHistoryChain(l)
+        c.filter(lambda x: x % 100).__add__([1, 2]).filter(lambda x: x < 900).__sub__([5])
+        self.assertEqual(len(c.object), 892)
+        self.assertEqual([len(d[2]) if isinstance(d[2], list) else d[2] for d in c.history],
+                         [10, 990, 99, 1])
+        self.assertListEqual(c.backward().object, [x for x in range(1000) if x % 100 and x < 900] + [1, 2])
+        self.assertListEqual(c.backward().object, [x for x in range(1000) if x % 100] + [1, 2])
+        self.assertListEqual(c.backward().object, [x for x in range(1000) if x % 100])
+        self.assertIsInstance(c.object, flist)
+        self.assertListEqual(c.backward().object, l)
+        self.assertFalse(c.history)
+
+    def test_tuple_dict_set(self):
+        c = DeltaHistoryChain(ftuple(range(50)))
+        c.filter(lambda x: x % 2).__sub__((1, 3))
+        self.assertEqual(c.backward().object, tuple(range(1, 50, 2)))
+        self.assertEqual(c.backward().object, tuple(range(50)))
+        self.assertIsInstance(c.object, ftuple)
+        d = dict((i, str(i)) for i in range(100))
+        dd = dict(d, a=1)
+        dd[3] = 'x'
+        del dd[4]
+        function, cls, data = delta(d, dd)
+        self.assertEqual(data, (['a'], {3: '3', 4: '4'}))
+        self.assertEqual(function(cls, dd, data), d)
+        s, ss = set(range(100)), set(range(2, 102))
+        function, cls, data = delta(s, ss)
+        self.assertEqual(data, (frozenset([100, 101]), frozenset([0, 1])))
+        self.assertEqual(function(cls, ss, data), s)
+        # other changes are snapshots
+        l = range(10)
+        self.assertIs(delta(l, l[::-1])[2], l)
+
+    def test_depth(self):
+        c = DeltaHistoryChain(flist(range(10)), depth=3)
+        for i in range(10, 15):
+            c.__add__([i])
+        self.assertEqual(len(c.history), 3)
+        self.assertListEqual(c.backward().backward().backward().object, range(12))
+        self.assertRaises(IndexError, c.backward)
+
+
+
+class DeferredChainTestCase(unittest.TestCase):
+
+    def test_plan(self):
+        odd, big = (lambda x: x % 2), (lambda x: x > 3)
+        c = DeferredChain(flist(range(20)))
+        c.filter(odd).sort(reverse=True).append(100).extend([5, 6]).filter(big).filter(odd, True)
+        c.sort(reverse=True).sort(reverse=True).discard_all([7]).discard_all([9])
+        self.assertEqual(len(c.plan), 10)
+        self.assertListEqual(_optimize(c.plan), [
+            ('filter', [(odd, False)]),
+            ('sort', ((), {'reverse': True})),
+            ('extend', [(100,), [5, 6]]),
+            ('filter', [(big, False), (odd, True)]),
+            ('sort', ((), {'reverse': True})),
+            ('discard_all', [[7], [9]])])
+        self.assertListEqual(c.object, [100, 6])
+        self.assertIsInstance(c.object, flist)
+        self.assertFalse(c.plan)
+
+    def test_deferred(self):
+        calls = []
+        l = flist(range(10))
+        c = DeferredChain(l)
+        self.assertIs(c.filter(calls.append), c)
+        self.assertFalse(calls)
+        self.assertEqual(c.count(None, bool), 0)
+        self.assertEqual(len(calls), 10)
+        # in place methods apply to the inner instance
+        c = DeferredChain(l).extend('ab').append(1).sort()
+        self.assertEqual(repr(c), "DeferredChain([0, 1, 1, 2, 3, 4, 5, 6, 7, 8, 9, 'a', 'b'])")
+        self.assertIs(c.object, l)
+        self.assertIs(c.discard_all([1, 'a']).run().object, l)
+        self.assertEqual(l[-1], 'b')
+        self.assertIs(c.filter().object.__class__, flist)
+        self.assertIsNot(c.object, l)
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -2,9 +2,12 @@
 
 from replacement import *
 from fcontainers import DuplicateValueError
-from predicates import Where, UnknownOperatorError, RegExp
+from predicates import Where, UnknownOperatorError, RegExp, numpy
+import pickle
 import unittest
 
+import parallel
+
 
 class TupleTestCas(unittest.TestCase):
 
@@ -20,6 +23,35 @@ class TupleTestCas(unittest.TestCase):
         self.assertEqual(l.filter(f=lambda x: x != 'b'), ('a', 'c'))
         self.assertEqual(l, ('a', 'b', 'c'))
 
+    def test_contains(self):
+        t = tuple('abc')
+        self.assertIn('b', t)
+        self.assertIsNone(t._set_cache)
+        t = tuple(range(100))
+        self.assertIn(99, t)
+        self.assertNotIn(100, t)
+        self.assertSetEqual(t._set_cache, set(range(100)))
+        self.assertTrue(t.contains_all(range(50)))
+        self.assertFalse(t.contains_any([-1, 100]))
+        t = tuple([[i] for i in range(100)])
+        self.assertIn([99], t)
+        self.assertNotIn(99, t)
+        self.assertIs(t._set_cache, False)
+
+    def test_sub(self):
+        t = tuple('abcab')
+        self.assertTupleEqual(t - 'bx', ('a', 'c', 'a'))
+        self.assertEqual(type(t - 'b'), tuple)
+        self.assertIs(t - 'xy', t)
+        self.assertTupleEqual(tuple([1], 2) - [[1]], (2,))
+        t = tuple(range(100))
+        self.assertTupleEqual(t - range(1, 100), (0,))
+        # unhashable elements
+        t = tuple([1], 2)
+        self.assertIs(t - [3], t)
+        self.assertTupleEqual(t - [2], ([1],))
+        self.assertTupleEqual(t - [[1]], (2,))
+
 
 class ListTestCase(unittest.TestCase):
 
@@ -84,6 +116,19 @@ class ListTestCase(unittest.TestCase):
         l -= 'cx'
         self.assertListEqual(l, ['a', 'b', 'd'])
 
+    def test_bulk_removal(self):
+        l = list(range(20) * 2)
+        self.assertListEqual(l - range(0, 20, 2), range(1, 20, 2) + range(20))
+        self.assertListEqual(l.remove_all(range(15) * 2), range(15, 20) * 2)
+        self.assertRaises(ValueError, l.remove_all, range(15, 30))
+        self.assertListEqual(l, range(15, 20) * 2)
+        self.assertListEqual(l.discard_all(range(15, 30)), range(15, 20))
+        l = list([1], 2, [3], 4, 5, 6, 7, 8, 9, 10, 11)
+        self.assertListEqual(l.discard_all([[1], 2, 3, 4, 5, 6, 7, 8, 9, 10]), [[3], 11])
+        self.assertListEqual(list([1], 2) - range(3, 20), [[1], 2])
+        self.assertSetEqual(set('abc') - list('bx'), set('ac'))
+        self.assertSetEqual(set('abc') - [[1]], set('abc'))
+
     def test_all_none(self):
         l1 = list((None, None, None))
         l2 = list((None, None, False))
@@ -109,10 +154,97 @@ class ListTestCase(unittest.TestCase):
         self.assertEqual(l.filter(f=lambda x: x != 'b'), ['a', 'c'])
         self.assertEqual(l, ['a', 'b', 'c'])
 
+    def test_filter_lazy(self):
+        calls = []
+        def f(x):
+            calls.append(x)
+            return x != 'b'
+        l = list('abcd')
+        view = l.filter(f, lazy=True).filter(lambda x: x != 'c')
+        self.assertListEqual(calls, [])
+        self.assertEqual(view.first(), 'a')
+        self.assertListEqual(calls, ['a'])
+        self.assertListEqual(list(view), ['a', 'd'])
+        self.assertEqual(view.count(), 2)
+        self.assertTrue(view.all(lambda x: x in 'ad'))
+        self.assertFalse(view.any(lambda x: x == 'b'))
+        self.assertEqual(type(view.materialize()), list)
+        self.assertListEqual(view.materialize(), l.filter(f).filter(lambda x: x != 'c'))
+        self.assertListEqual(l.view().filter(f, negate=True).materialize(), ['b'])
+        self.assertListEqual(l.filter_index(lambda i, x: i > 1, lazy=True).filter(f).materialize(), ['c', 'd'])
+        self.assertSetEqual(dict(a=1, b=2).filter(lambda k: k == 'a', lazy=True).materialize(), set('a'))
+
+    def test_filter_parallel(self):
+        l = list(dict(name=c, age=i) for i, c in enumerate('abcdefghij' * 10))
+        where = Where(name__search='[aeiou]', age__gte=20)
+        self.assertEqual(l.filter_parallel(where), l.filter(where))
+        threshold, parallel.threshold = parallel.threshold, 0
+        try:
+            self.assertEqual(type(l.filter_parallel(where, processes=2)), list)
+            self.assertEqual(l.filter_parallel(where, processes=2), l.filter(where))
+            self.assertEqual(l.filter_parallel(where, negate=True, processes=2), l.filter(where, negate=True))
+        finally:
+            parallel.threshold = threshold
+
     def test_reduce(self):
         l = list('this is rich in "i"')
         self.assertEqual(l.count(f=lambda x: x == 'i'), 5)
         self.assertEqual(l.count(f=lambda x: x == ' '), 4)
+        self.assertEqual(l.count('i'), 5)
+        self.assertEqual(l.count(lambda x: x == 'i'), 5)
+        self.assertEqual(list(1, 2).count(lambda x: True), 2)
+        self.assertEqual(l.count(), len(l))
+        self.assertEqual(list(0, 1, '', 'a').count(), 2)
+        self.assertEqual(l.reduce(), len(l))
+        self.assertEqual(list().reduce(), 0)
+        self.assertEqual(l.reduce(lambda x: x.upper()), 'THIS IS RICH IN "I"')
+        self.assertListEqual(list(1, 2).reduce(lambda x: [x] * x), [1, 2, 2])
+        self.assertEqual(list(1, 2).reduce(lambda x: (x,)), (1, 2))
+        self.assertEqual(list(1, 2, 3).sum(), 6)
+        self.assertEqual(list(1, 2, 3).sum(lambda x: x * x, 1), 15)
+
+    def test_contains(self):
+        l = list(range(10))
+        self.assertTrue(l.contains_all(range(10)))
+        self.assertFalse(l.contains_all(range(11)))
+        self.assertFalse(l.contains_all(set(range(11))))
+        self.assertTrue(l.contains_any(xrange(9, 20)))
+        self.assertFalse(l.contains_any(set(range(10, 20))))
+        self.assertTrue(list(2, 3).all_in(l))
+        self.assertFalse(list(range(5, 15)).all_in(l))
+        self.assertTrue(list(range(5, 15)).any_in(l))
+        self.assertFalse(set(range(10, 20)).any_in(l))
+        self.assertTrue(set(1, 2).all_in(set(range(5))))
+        # unhashable elements, in the receiver or in the argument
+        l = list([1], 2, 3, 4, 5, 6, [7])
+        self.assertTrue(l.contains_all(list(2, 3, 4, 5, 6, [7], [1])))
+        self.assertFalse(l.contains_all(list(2, 3, 4, 5, 6, [8])))
+        self.assertTrue(list(1, 2, 3, 4, 5, 6, [1]).all_in(list([1], 6, 5, 4, 3, 2, 1)))
+        self.assertTrue(list(7, 8, 9, 10, 11, [7]).any_in(l))
+        self.assertFalse(list([1], 2).contains_any(set([3])))
+        self.assertTrue(list([1], 2).contains_any(dict.fromkeys([2])))
+        # strings search substrings, they are never replaced by a set of their characters
+        self.assertTrue(list(['a', 'b', 'c', 'd', 'ab']).all_in('abcd'))
+        self.assertTrue(set(['ab', 'bc', 'cd', 'abc', 'bcd', 'abcd']).all_in('abcd'))
+        self.assertTrue(set(['xy', 'zt', 'bc']).any_in('abcd'))
+        self.assertTrue(list(['x', 'y', 'z', 't', 'u', 'cd']).any_in('abcd'))
+
+    def test_fast_paths(self):
+        l = list(0, 1, '', 'a', None)
+        self.assertListEqual(l.filter(), [1, 'a'])
+        self.assertListEqual(l.filter(negate=True), [0, '', None])
+        self.assertEqual(l.first(), 1)
+        self.assertEqual(l.first(negate=True), 0)
+        self.assertIsNone(list().first())
+        self.assertFalse(l.all())
+        self.assertTrue(l.any())
+        self.assertTrue(l.all(lambda x: x != 2))
+        self.assertListEqual(l.filter_index(), l)
+        self.assertListEqual(l.filter_index(negate=True), [])
+        self.assertListEqual(l.filter_index(lambda i, x: i % 2), [1, 'a'])
+        self.assertListEqual(l.filter_index(lambda i, x: i % 2, negate=True), [0, '', None])
+        view = l.filter_index(lambda i, x: i % 2, lazy=True)
+        self.assertListEqual(list(view), list(view))
 
 
 class DictTestCase(unittest.TestCase):
@@ -367,6 +499,83 @@ class WhereTestCase(unittest.TestCase):
         where = Where(name='abcdef', value__inrange=(10, 13), _key_missing_=None)
         self.assertRaises(KeyError, where, data)
 
+    def test_missing_key_several_terms(self):
+        data = self.data
+        where = Where(name='abcdef', value__gt=10, age__lt=13, _key_missing_=True)
+        self.assertTrue(where(data))
+        where = Where(name='abcdef', value__gt=10, age__lt=12, _key_missing_=True)
+        self.assertFalse(where(data))
+        where = Where({'value': 1}, {'name': 'abcdef'})
+        self.assertTrue(where(data))
+
+    def test_notinrange(self):
+        data = self.data
+        self.assertTrue(Where(age__nrange=(13, 20))(data))
+        self.assertFalse(Where(age__nrange=(10, 13))(data))
+        self.assertFalse(Where(value__nrange=(10, 13))(data))
+
+    def test_add_term(self):
+        data = self.data
+        where = Where(name='toto')
+        where.add_term({'age': 12})
+        self.assertTrue(where(data))
+        self.assertEqual(len(where.plan), 2)
+
+    def test_static_plan(self):
+        where = Where(name__search='a', age__inrange=(10, 13), name__icontains='b', name='abcdef')
+        self.assertListEqual([op for _, op, _ in where.plan[0]],
+                             [Where.operators[op] for op in ('eq', 'inrange', 'icontains', 'search')])
+        self.assertTrue(where(self.data))
+
+    def test_adaptive_plan(self):
+        records = [dict(a=i, b=1) for i in range(20)]
+        where = Where(a__gt=15, b=1, _adaptive_=10)
+        self.assertListEqual([field for field, _, _ in where.plan[0]], ['b', 'a'])
+        self.assertListEqual(list(records).filter(where), records[16:])
+        self.assertListEqual([field for field, _, _ in where.plan[0]], ['a', 'b'])
+        self.assertListEqual(list(records).filter(where), records[16:])
+        where = Where({'a__gte': 18}, {'a__lt': 18}, _adaptive_=10)
+        self.assertEqual(list(records).filter(where), records)
+        self.assertEqual(where.plan[0][0][1], Where.operators['lt'])
+
+    @unittest.skipIf(numpy is None, "numpy is not installed")
+    def test_mask(self):
+        records = [dict(name='Abc', age=12), dict(name='abd', age=20), dict(name='xyz', age=30)]
+        columns = dict(name=numpy.array(['Abc', 'abd', 'xyz']), age=numpy.array([12, 20, 30]))
+        for where in (Where(age=20), Where(age__gt=12), Where(age__lte=20), Where(age__inrange=(12, 30)),
+                      Where(age__nrange=(12, 30)), Where(name__ieq='abc'), Where(name__icont='b', age__neq=12),
+                      Where(name__start='a'), Where(name__iend='C'), Where(name__search='[bz]$'),
+                      Where({'name__istart': 'ab', 'age__gte': 15}, {'name': 'xyz'}),
+                      Where(value=1), Where(value=1, age=12, _key_missing_=True)):
+            self.assertListEqual(where.mask(columns).tolist(), [where(r) for r in records])
+        self.assertRaises(KeyError, Where(value=1, _key_missing_=None).mask, columns)
+
+    def test_pickle(self):
+        where = Where({'name__search': 'b.d', 'age__inrange': (10, 13)}, {'age': 13}, _key_missing_=None)
+        clone = pickle.loads(pickle.dumps(where))
+        self.assertEqual(clone.missing, None)
+        self.assertEqual([[(f, op) for f, op, _ in t] for t in clone.plan],
+                         [[(f, op) for f, op, _ in t] for t in where.plan])
+        self.assertTrue(clone(self.data))
+        self.assertRaises(KeyError, clone, dict(name='x'))
+
+    def test_profile(self):
+        records = [dict(name='abc', age=12), dict(name='abd', age=20), dict(name='xyz')]
+        where = Where(name__start='ab', age__gt=15, _profile_=True)
+        self.assertListEqual(list(records).filter(where), records[1:2])
+        report = where.profile()
+        self.assertListEqual(sorted(report), [('age', 'gt'), ('name', 'startswith')])
+        stats = report[('age', 'gt')]
+        self.assertEqual((stats['evaluations'], stats['passes'], stats['missing']), (3, 1, 1))
+        stats = report[('name', 'startswith')]
+        self.assertEqual((stats['evaluations'], stats['passes'], stats['missing']), (1, 1, 0))
+        self.assertTrue(stats['time'] > 0)
+        where.reset_profile()
+        self.assertEqual(where.profile()[('age', 'gt')]['evaluations'], 0)
+        where = Where(value=1, _profile_=True, _key_missing_=None)
+        self.assertRaises(KeyError, where, records[0])
+        self.assertEqual(where.profile()[('value', 'equals')]['missing'], 1)
+
     def test_or(self):
         data = self.data
         where = Where({'name': 'abcdef'}, {'age': 13})
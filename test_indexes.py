@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+
+import unittest
+
+from fcontainers import flist
+from indexes import IndexedList, HashIndex, SortedIndex, PrefixIndex, TrigramIndex, lower, successor, \
+    required_literals
+from predicates import Where, RegExp
+
+
+class IndexedListTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.records = [
+            dict(name='Bob', age=12),
+            dict(name='alice', age='31'),
+            dict(name='bob', age=40),
+            dict(name='carl'),
+            dict(name='Dan', age=12),
+        ]
+        self.l = IndexedList(self.records).add_index(HashIndex('name', str)) \
+            .add_index(HashIndex('name', lower)).add_index(SortedIndex('age', int))
+
+    def assertQuery(self, where, served=True):
+        self.assertEqual(self.l._candidates(where) is not None, served)
+        self.assertListEqual(self.l.filter(where), flist(self.l).filter(where))
+        self.assertIs(type(self.l.filter(where)), flist)
+
+    def test_hash(self):
+        self.assertQuery(Where(name='bob'))
+        self.assertQuery(Where(name__ieq='bob'))
+        self.assertListEqual(self.l.filter(Where(name__ieq='bob')), [self.records[0], self.records[2]])
+
+    def test_sorted(self):
+        self.assertQuery(Where(age=12))
+        self.assertQuery(Where(age__gt=12))
+        self.assertQuery(Where(age__gte=12))
+        self.assertQuery(Where(age__lt=40))
+        self.assertQuery(Where(age__lte=31))
+        self.assertQuery(Where(age__inrange=(12, 40)))
+        self.assertListEqual(self.l.filter(Where(age__inrange=(12, 40))),
+                             [self.records[0], self.records[1], self.records[4]])
+
+    def test_conjunctions(self):
+        self.assertQuery(Where(name__ieq='bob', age__gt=20))
+        self.assertQuery(Where({'name': 'Dan'}, {'age__lt': 20}))
+        self.assertQuery(Where(name__ieq='bob', name__search='^b'))
+        self.assertQuery(Where({'name': 'Dan'}, {'name__search': 'c'}), served=False)
+        self.assertQuery(Where(age__gt=12.5), served=False)
+
+    def test_missing(self):
+        self.assertQuery(Where(age__lt=20, _key_missing_=True))
+        self.assertIn(self.records[3], self.l.filter(Where(age__lt=20, _key_missing_=True)))
+        where = Where(age__lt=20, _key_missing_=None)
+        self.assertIsNone(self.l._candidates(where))
+        self.assertRaises(KeyError, self.l.filter, where)
+
+    def test_uncoercible(self):
+        # 'n/a' can not be indexed by int: it is a candidate of every term, as the scan evaluates it
+        self.l.append(dict(name='eve', age='n/a'))
+        for index in self.l.indexes:
+            self.assertEqual(len(index.keys) + len(index.missing) + len(index.others), 6)
+        self.assertIn(5, self.l.indexes[2].others)
+        where = Where(age__lt=5, _key_missing_=True)
+        self.assertIsNotNone(self.l._candidates(where))
+        self.assertRaises(ValueError, self.l.filter, where)
+        self.assertRaises(ValueError, flist(self.l).filter, where)
+        self.l.pop()
+        self.assertFalse(self.l.indexes[2].others)
+        self.assertQuery(where)
+
+    def test_prefix(self):
+        self.l.add_index(PrefixIndex('name', casefold=True))
+        self.assertQuery(Where(name__istart='b'))
+        self.assertQuery(Where(name__istart='bo', age=12))
+        self.assertQuery(Where(name__start='B'))
+        self.assertQuery(Where(name__istart=''))
+        self.assertQuery(Where(name__nistart='b'), served=False)
+        l = IndexedList(self.records).add_index(PrefixIndex('name')).append(dict(name=12))
+        self.assertIsNone(l._candidates(Where(name__istart='b')))
+        self.assertIsNone(l._candidates(Where(name__start=('b', 'c'))))
+        # values that are not strings are candidates, evaluated by the Where as without index
+        where = Where(name__start='b')
+        self.assertIn(5, l._candidates(where))
+        self.assertRaises(AttributeError, l.filter, where)
+        self.assertRaises(AttributeError, flist(l).filter, where)
+        l.pop()
+        self.assertListEqual(l.filter(where), [self.records[2]])
+        self.assertListEqual(l.filter(Where(name__start=('b', 'c'))), [self.records[2], self.records[3]])
+
+    def test_successor(self):
+        self.assertEqual(successor('abc'), 'abd')
+        self.assertEqual(successor('a\xff'), 'b')
+        self.assertEqual(successor(u'a'), u'b')
+        self.assertIsNone(successor(''))
+
+    def test_trigram(self):
+        self.l = IndexedList(self.records + [dict(name='ALICIA')]).add_index(TrigramIndex('name'))
+        self.assertQuery(Where(name__cont='lic'))
+        self.assertQuery(Where(name__icont='LIC'))
+        self.assertQuery(Where(name__search='(?i)^ali(c|x)'))
+        self.assertQuery(Where(name__match='a.ice'))
+        self.assertQuery(Where(name__match='a.ic'), served=False)
+        self.assertQuery(Where(name__cont='bo'), served=False)
+        self.assertListEqual(self.l.filter(Where(name__icont='lic')), [self.records[1], dict(name='ALICIA')])
+        self.l.remove(dict(name='ALICIA'))
+        self.assertQuery(Where(name__icont='lic'))
+        self.l.append(dict(name=['bob']))
+        self.assertQuery(Where(name__cont='bob'))
+        self.assertListEqual(self.l.filter(Where(name__cont='bob')), [self.records[2], dict(name=['bob'])])
+
+    def test_required_literals(self):
+        self.assertListEqual(required_literals(RegExp('abc')), ['abc'])
+        self.assertListEqual(required_literals(RegExp('ab+cd(efg|h)i(jkl)')), ['a', 'cd', 'i', 'jkl'])
+        self.assertListEqual(required_literals(RegExp('a|b')), [])
+
+    def test_mutations(self):
+        l = self.l
+        l.append(dict(name='BOB', age=1)).extend([dict(name='eve', age=12), dict(name='bob')])
+        l.remove(self.records[0]).discard_all([self.records[2], self.records[2]])
+        l.insert(0, dict(name='Bobby', age=15))
+        l[1] = dict(name='bob', age=13)
+        del l[-2]
+        l += [dict(name='bob', age=99)]
+        self.assertEqual(l.pop(), dict(name='bob', age=99))
+        for where in (Where(name__ieq='bob'), Where(age__gte=12), Where(name='eve', age=12)):
+            self.assertQuery(where)
+        l.sort(key=lambda r: r['name'])
+        self.assertQuery(Where(age__gte=12))
+        self.assertListEqual(l.clear().filter(Where(age__gte=12)), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+
+import pickle
+import unittest
+
+from base_list import clist
+from fcontainers import flist
+from helpers import constant_contains, mixin_factory
+from mixins import CacheCountMixin
+
+cflist = mixin_factory('cflist', CacheCountMixin, flist)
+
+
+class CacheCountTestCase(unittest.TestCase):
+
+    def assertCache(self, l):
+        self.assertTrue(constant_contains(l))
+        counts = {}
+        for x in l:
+            counts[x] = counts.get(x, 0) + 1
+        self.assertDictEqual(l._count_cache, counts)
+
+    def test_mutations(self):
+        for cls in (clist, cflist):
+            l = cls('abca')
+            self.assertCache(l)
+            self.assertIn('a', l)
+            self.assertNotIn('z', l)
+            l.append('z').extend('xyz').insert(1, 'w')
+            self.assertCache(l)
+            l.remove('a').discard('a').discard('q').remove_all('xy').discard_all('zq')
+            self.assertCache(l)
+            self.assertNotIn('a', l)
+            self.assertEqual(l.pop(), 'z')
+            self.assertEqual(l.pop(0), 'w')
+            self.assertCache(l)
+            l[0] = 'e'
+            l[1:2] = iter('fgh')
+            l[::2] = 'ij'
+            l.extend(l)
+            self.assertCache(l)
+            del l[0]
+            del l[1:3]
+            del l[::2]
+            self.assertCache(l)
+            l += 'kk'
+            l -= 'k'
+            l *= 3
+            self.assertCache(l)
+            l.clear()
+            self.assertCache(l)
+
+    def test_bulk_removal(self):
+        for cls in (clist, cflist):
+            l = cls(range(20) * 2)
+            self.assertRaises(ValueError, l.remove_all, range(15) + [99])
+            self.assertEqual(len(l), 40)
+            self.assertCache(l)
+            self.assertIs(l.remove_all(range(15)), l)
+            self.assertListEqual(l, range(15, 20) + range(20))
+            self.assertCache(l)
+            l.discard_all(range(10, 30) + [15])
+            self.assertListEqual(l, range(10) + range(16, 20))
+            self.assertCache(l)
+
+    def test_unhashable(self):
+        l = clist('ab')
+        l.append([1])
+        self.assertFalse(constant_contains(l))
+        self.assertIn([1], l)
+        self.assertIn('a', l)
+        l.remove('a').clear().append('c')
+        self.assertCache(l)
+        self.assertNotIn([1], l)
+
+    def test_pickle(self):
+        l = pickle.loads(pickle.dumps(clist('abca'), 2))
+        self.assertEqual(l, list('abca'))
+        self.assertCache(l)
+
+
+if __name__ == '__main__':
+    unittest.main()
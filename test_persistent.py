@@ -0,0 +1,170 @@
+# -*- coding: utf-8 -*-
+
+import pickle
+import random
+import unittest
+
+from persistent import pdict, ptuple
+
+
+class Key(object):
+    """ Key with a chosen hash, to create collisions
+    """
+
+    def __init__(self, name, h):
+        self.name = name
+        self.h = h
+
+    def __hash__(self):
+        return self.h
+
+    def __eq__(self, other):
+        return isinstance(other, Key) and self.name == other.name
+
+    def __ne__(self, other):
+        return not self == other
+
+
+class EqKey(object):
+    """ Key defining only __eq__, so that != compares identities
+    """
+
+    def __init__(self, v):
+        self.v = v
+
+    def __hash__(self):
+        return self.v
+
+    def __eq__(self, other):
+        return isinstance(other, EqKey) and self.v == other.v
+
+
+class PersistentDictTestCase(unittest.TestCase):
+
+    def test_mapping(self):
+        d = pdict(a=1, b=2)
+        self.assertEqual(d, dict(a=1, b=2))
+        self.assertEqual(len(d), 2)
+        self.assertEqual(d['a'], 1)
+        self.assertRaises(KeyError, d.__getitem__, 'c')
+        self.assertEqual(d.get('c', 3), 3)
+        self.assertIn('b', d)
+        self.assertSetEqual(set(d), set('ab'))
+        self.assertEqual(pdict([('a', 1)], b=2), d)
+        self.assertEqual(hash(d), hash(pdict(b=2, a=1)))
+        self.assertEqual(pickle.loads(pickle.dumps(d)), d)
+
+    def test_persistence(self):
+        d = pdict((i, i) for i in range(1000))
+        e = d.set(1, 'x').remove(2).discard(2000)
+        self.assertEqual(d, dict((i, i) for i in range(1000)))
+        self.assertEqual(len(e), 999)
+        self.assertEqual(e[1], 'x')
+        self.assertNotIn(2, e)
+        self.assertRaises(KeyError, e.remove, 2)
+        self.assertIs(d.set(1, 1), d)
+        self.assertIs(d.discard(-1), d)
+        # only the path to the changed key is copied
+        self.assertLessEqual(len(set(map(id, d._root.entries)) - set(map(id, e._root.entries))), 2)
+        self.assertEqual(d.update({1: 'x'}, y=2), d.set(1, 'x').set('y', 2))
+
+    def test_random(self):
+        d, reference = pdict(), {}
+        for _ in xrange(5000):
+            k = random.randrange(500)
+            if random.random() < 0.4:
+                d = d.discard(k)
+                reference.pop(k, None)
+            else:
+                d = d.set(k, k * 2)
+                reference[k] = k * 2
+            self.assertEqual(len(d), len(reference))
+        self.assertEqual(d, reference)
+        self.assertEqual(dict(d.iteritems()), reference)
+
+    def test_collisions(self):
+        keys = [Key(str(i), i % 3) for i in range(30)]
+        d = pdict((k, k.name) for k in keys)
+        self.assertEqual(len(d), 30)
+        self.assertEqual(d[Key('7', 1)], '7')
+        d = d - keys[:29]
+        self.assertEqual(d, {keys[29]: '29'})
+        self.assertEqual(pdict({Key('a', -1): 1, Key('b', -1): 2, Key('c', 2 ** 70): 3}).discard(Key('a', -1)),
+                         {Key('b', -1): 2, Key('c', 2 ** 70): 3})
+
+    def test_eq_only_keys(self):
+        d = pdict((EqKey(i), i) for i in range(20))
+        self.assertIn(EqKey(1), d)
+        self.assertEqual(len(d.remove(EqKey(1))), 19)
+        self.assertNotIn(EqKey(2), d.discard(EqKey(2)))
+        self.assertEqual(len(d - [EqKey(3), EqKey(4)]), 18)
+        self.assertEqual(len(d.filter_dict(lambda k, v: v > 9)), 10)
+
+    def test_operators(self):
+        d = pdict(a=1, b=2, c=3, d=4)
+        self.assertEqual(d + 'ae', dict(a=None, b=2, c=3, d=4, e=None))
+        self.assertEqual(d + dict(a=0), dict(a=0, b=2, c=3, d=4))
+        self.assertEqual(d | 'e', d + 'e')
+        self.assertEqual(d.add_difference(dict(a=0, e=5)), dict(a=1, b=2, c=3, d=4, e=5))
+        self.assertEqual(d - 'adx', dict(b=2, c=3))
+        self.assertEqual(d & 'bcx', dict(b=2, c=3))
+        self.assertEqual(d * dict(b=0), dict(b=2))
+        self.assertEqual(d.filter_dict(lambda k, v: v % 2), dict(a=1, c=3))
+        self.assertEqual(d.filter_dict(lambda k, v: v % 2, negate=True), dict(b=2, d=4))
+        self.assertEqual(d.reverse(), {1: 'a', 2: 'b', 3: 'c', 4: 'd'})
+        self.assertEqual(pdict(a=1, b=1).reverse('count'), {1: 2})
+        self.assertEqual(type(d - 'a'), pdict)
+        self.assertEqual(d, dict(a=1, b=2, c=3, d=4))
+
+
+class PersistentVectorTestCase(unittest.TestCase):
+
+    def test_build(self):
+        for n in (0, 1, 31, 32, 33, 1024, 1025, 32 * 32 * 32 + 33):
+            p = ptuple(range(n))
+            q = ptuple()
+            for i in range(n):
+                q = q.append(i)
+            self.assertEqual(len(p), n)
+            self.assertListEqual(list(p), range(n))
+            self.assertEqual(p, q)
+            self.assertEqual(p, tuple(range(n)))
+            for i in range(0, n, max(1, n // 50)):
+                self.assertEqual(p[i], i)
+        self.assertEqual(ptuple(1, 2), (1, 2))
+        self.assertEqual(ptuple('ab'), ('a', 'b'))
+
+    def test_persistence(self):
+        p = ptuple(range(100))
+        q = p.set(50, 'x').set(99, 'y') + 'ab'
+        self.assertEqual(p, tuple(range(100)))
+        self.assertEqual(q[50], 'x')
+        self.assertEqual(q[-3:], ('y', 'a', 'b'))
+        # the first leaf is shared
+        self.assertIs(q._root[0], p._root[0])
+        self.assertRaises(IndexError, p.set, 100, 0)
+        self.assertRaises(IndexError, p.__getitem__, -101)
+
+    def test_api(self):
+        p = ptuple(range(70))
+        self.assertEqual(p.first(), 0)
+        self.assertEqual(p.last(), 69)
+        self.assertIsNone(ptuple().first())
+        body, tail = p, p
+        for k in range(70):
+            body, tail = body.body(), tail.tail()
+            self.assertEqual(body, tuple(range(69 - k)))
+            self.assertEqual(tail, tuple(range(k + 1, 70)))
+        self.assertEqual(p.tail().set(0, 'x').append('y')[:2], ('x', 2))
+        self.assertEqual(p.tail().append('y')[-2:], (69, 'y'))
+        self.assertEqual(p[::20], (0, 20, 40, 60))
+        self.assertEqual(type(p.filter(lambda x: x % 2)), ptuple)
+        self.assertEqual(p.filter(lambda x: x > 65), (66, 67, 68, 69))
+        self.assertIn(69, p)
+        self.assertEqual(p.index(42), 42)
+        self.assertEqual(hash(p), hash(tuple(range(70))))
+        self.assertEqual(pickle.loads(pickle.dumps(p.tail())), tuple(range(1, 70)))
+
+
+if __name__ == '__main__':
+    unittest.main()
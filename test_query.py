@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+
+import unittest
+
+from replacement import list, tuple, dict, set
+from query import Query
+
+
+class QueryTestCase(unittest.TestCase):
+
+    records = list(
+        dict(name='bob', age=12, city='paris'),
+        dict(name='alice', age=40, city='lyon'),
+        dict(name='carol', age=12, city='paris'),
+        dict(name='dave', age=25),
+        dict(name='eve', age=40, city='paris'),
+    )
+
+    def test_streaming(self):
+        q = self.records.query().where(lambda r: r['age'] > 12).select(lambda r: r['name'])
+        self.assertListEqual(list(q), ['alice', 'dave', 'eve'])
+        self.assertEqual(type(q.materialize()), list)
+        self.assertEqual(len(q.plan()), 1)
+        self.assertListEqual(q.skip(1).take(1).materialize(), ['dave'])
+        self.assertListEqual(q.take(0).materialize(), [])
+        self.assertEqual(q.count(), 3)
+        self.assertEqual(q.first(), 'alice')
+        self.assertIsNone(q.where(lambda name: name == 'zorro').first())
+        q = self.records.query().where(city='paris').select(lambda r: r['age']).distinct()
+        self.assertListEqual(q.materialize(), [12, 40])
+        self.assertSetEqual(tuple(1, 2, 3).query().select(lambda x: x * 2).materialize(set), set(2, 4, 6))
+
+    def test_early_termination(self):
+        seen = []
+        def source():
+            for x in xrange(1000):
+                seen.append(x)
+                yield x
+        q = Query(source).where(lambda x: x % 2).take(3).where(lambda x: x > 1).select(str)
+        self.assertListEqual(list(q), ['3', '5'])
+        self.assertListEqual(seen, range(6))
+        del seen[:]
+        self.assertEqual(Query(source).skip(10).first(), 10)
+        self.assertListEqual(seen, range(11))
+
+    def test_blocking(self):
+        q = self.records.query().order_by(lambda r: r['age'], reverse=True).select(lambda r: r['name'])
+        self.assertListEqual(list(q), ['alice', 'eve', 'dave', 'bob', 'carol'])
+        self.assertListEqual(list(q.skip(1).take(2)), ['eve', 'dave'])
+        self.assertEqual(len(q.skip(1).take(2).plan()), 2)
+        self.assertListEqual(list(q.take(10)), list(q))
+        # a negative skip skips nothing, as when streaming
+        l = [5, 3, 1, 4]
+        self.assertListEqual(list(Query(l.__iter__).order_by().skip(-1).take(2)), [1, 3])
+        q = self.records.query().group_by(lambda r: r['age']).select(lambda g: (g[0], len(g[1])))
+        self.assertListEqual(list(q), [(12, 2), (40, 2), (25, 1)])
+        self.assertListEqual(list(set(3, 1, 2).query().order_by()), [1, 2, 3])
+        self.assertEqual(type(set(3, 1, 2).query().materialize()), set)
+        self.assertEqual(type(dict(a=1).query().materialize()), set)
+
+    def test_reiterable(self):
+        l = list(1, 2, 3)
+        q = l.query().select(lambda x: -x)
+        self.assertListEqual(list(q), [-1, -2, -3])
+        l.append(4)
+        self.assertListEqual(list(q), [-1, -2, -3, -4])
+
+
+if __name__ == '__main__':
+    unittest.main()
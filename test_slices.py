@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+
+import json
+import pickle
+import unittest
+
+from base_list import alist, clist
+from base_tuple import atuple
+from slices import ListView, TupleView
+
+
+class TupleViewTestCase(unittest.TestCase):
+
+    def test_slices(self):
+        t = atuple(range(10))
+        v = t[2:8]
+        self.assertEqual(type(v), TupleView)
+        self.assertIs(v._parent, t)
+        self.assertEqual(len(v), 6)
+        self.assertListEqual(list(v), range(2, 8))
+        self.assertEqual(v, tuple(range(2, 8)))
+        self.assertEqual(v[1], 3)
+        self.assertEqual(v[-1], 7)
+        self.assertRaises(IndexError, v.__getitem__, 6)
+        self.assertEqual(v[::-2], (7, 5, 3))
+        self.assertIs(v[::-2]._parent, t)
+        self.assertEqual(type(t[::3]), tuple)
+        self.assertEqual(t[-3:], (7, 8, 9))
+        self.assertEqual(t[20:], ())
+        self.assertIn(4, v)
+        self.assertNotIn(9, v)
+        self.assertEqual(v.index(5), 3)
+        self.assertEqual(list(reversed(v)), range(7, 1, -1))
+        self.assertEqual(hash(v), hash(tuple(range(2, 8))))
+        self.assertEqual(type(v.materialize()), atuple)
+        self.assertEqual(v + (8,), tuple(range(2, 9)))
+
+    def test_api(self):
+        t = atuple('abcd')
+        self.assertEqual(t.body(), ('a', 'b', 'c'))
+        self.assertEqual(t.tail(), ('b', 'c', 'd'))
+        self.assertEqual(t.tail().tail().first(), 'c')
+        self.assertEqual(t.body().last(), 'c')
+        self.assertEqual(type(t.tail().filter(lambda x: x != 'c')), atuple)
+        self.assertEqual(t.tail().filter(lambda x: x != 'c'), ('b', 'd'))
+        self.assertEqual(t.tail().count('b'), 1)
+        self.assertEqual(pickle.loads(pickle.dumps(t.tail())), ('b', 'c', 'd'))
+
+    def test_sequence_protocol(self):
+        t = atuple(range(5))
+        self.assertIs(t[:], t)
+        self.assertEqual((0,) + t[1:], (0, 1, 2, 3, 4))
+        self.assertEqual(t[:2] * 2, (0, 1, 0, 1))
+        self.assertEqual(2 * t[:2], (0, 1, 0, 1))
+        self.assertTrue(t[:2] < t[1:3])
+        self.assertTrue(t[:2] <= (0, 1))
+        self.assertTrue(t[1:] > (1, 1))
+        self.assertFalse(t[1:] >= t[2:])
+
+
+class ListViewTestCase(unittest.TestCase):
+
+    def test_copy_on_write(self):
+        l = alist(range(10))
+        v = l[2:5]
+        self.assertEqual(type(v), ListView)
+        w = v[1:]
+        l.append(10)
+        l[3] = 'x'
+        self.assertListEqual(list(v), [2, 3, 4])
+        self.assertListEqual(list(w), [3, 4])
+        v.append(5)
+        v[0] = 'y'
+        self.assertListEqual(list(v), ['y', 3, 4, 5])
+        self.assertListEqual(list(w), [3, 4])
+        self.assertEqual(l[3], 'x')
+        self.assertEqual(type(v.materialize()), alist)
+        u = l[:]
+        l.sort(key=str).reverse()
+        self.assertListEqual(list(u), [0, 1, 2, 'x', 4, 5, 6, 7, 8, 9, 10])
+        u += [12]
+        u.remove('x')
+        self.assertEqual(u, [0, 1, 2, 4, 5, 6, 7, 8, 9, 10, 12])
+
+    def test_mutations_detach(self):
+        for mutate in (lambda l: l.clear(), lambda l: l.pop(), lambda l: l.insert(0, 'x'),
+                       lambda l: l.remove(1), lambda l: l.discard(1), lambda l: l.remove_all([1]),
+                       lambda l: l.__delitem__(0), lambda l: l.__delslice__(0, 2),
+                       lambda l: l.__setslice__(0, 2, 'xy'), lambda l: l.__iadd__([5]),
+                       lambda l: l.__imul__(2), lambda l: l.extend('x')):
+            l = clist(range(5))
+            v = l[:3]
+            mutate(l)
+            self.assertListEqual(list(v), [0, 1, 2])
+            self.assertDictEqual(l._count_cache, clist(l)._count_cache)
+
+    def test_api(self):
+        l = alist('abcd')
+        self.assertEqual(l.tail(), ['a', 'b', 'c'])
+        self.assertEqual(l.tail().filter(lambda x: x != 'b'), ['a', 'c'])
+        self.assertEqual(type(l.tail().filter()), alist)
+        self.assertEqual(l[1:].any(lambda x: x == 'a'), False)
+        self.assertEqual(pickle.loads(pickle.dumps(l[1:])), ['b', 'c', 'd'])
+        for protocol in (0, 2):
+            v = l[1:3]
+            self.assertEqual(pickle.loads(pickle.dumps((v, l), protocol)), (['b', 'c'], ['a', 'b', 'c', 'd']))
+            c = pickle.loads(pickle.dumps(clist('ab').extend('cd'), protocol))
+            self.assertEqual(c, list('abcd'))
+            self.assertIn('d', c)
+
+    def test_sequence_protocol(self):
+        l = alist(range(5))
+        self.assertEqual(type(l[:]), alist)
+        self.assertIsNot(l[:], l)
+        self.assertEqual([0] + l[1:], [0, 1, 2, 3, 4])
+        self.assertEqual(l[:2] * 2, [0, 1, 0, 1])
+        self.assertEqual(2 * l[:2], [0, 1, 0, 1])
+        self.assertTrue(l[:2] < l[1:3])
+        self.assertTrue(l[:2] <= [0, 1])
+        self.assertTrue(l[1:] > [1, 1])
+        self.assertFalse(l[1:] >= l[2:])
+        self.assertEqual(json.dumps(l[1:].materialize()), '[1, 2, 3, 4]')
+
+
+if __name__ == '__main__':
+    unittest.main()
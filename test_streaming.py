@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+
+import json
+import os
+import tempfile
+import unittest
+
+from predicates import Where
+from streaming import iter_jsonl, literals
+
+
+class StreamingTestCase(unittest.TestCase):
+
+    records = [
+        dict(name='abcdef', age=12, tags=['x', 'y']),
+        dict(name='abcxyz', age='12', ratio=1.5),
+        dict(name='ete', city=u'\xc9t\xe9', age=40, flag=True),
+        dict(name='zorro', age=12.0),
+        dict(other='abc'),
+    ]
+
+    def setUp(self):
+        fd, self.filename = tempfile.mkstemp(suffix='.jsonl')
+        with os.fdopen(fd, 'w') as f:
+            for r in self.records:
+                f.write(json.dumps(r) + '\n')
+            f.write('\n')
+
+    def tearDown(self):
+        os.remove(self.filename)
+
+    def assertStream(self, where):
+        expected = [json.loads(json.dumps(r)) for r in self.records]
+        if where is not None:
+            expected = [r for r in expected if where(r)]
+        self.assertListEqual(list(iter_jsonl(self.filename, where)), expected)
+
+    def test_literals(self):
+        self.assertListEqual(literals(Where(name='abc', age=12)), [[b'"age"', b'"name"', b'abc']])
+        self.assertListEqual(literals(Where(name__cont='b"c', age__gt=12)), [[b'"age"', b'"name"']])
+        self.assertListEqual(literals(Where(ratio='1.5')), [[b'"ratio"']])
+        self.assertIsNone(literals(Where(name='abc', _key_missing_=True)))
+
+    def test_stream(self):
+        self.assertStream(None)
+        self.assertStream(Where(name='abcdef'))
+        self.assertStream(Where(name__start='abc', age=12))
+        self.assertStream(Where(age='12'))
+        self.assertStream(Where(ratio='1.5'))
+        self.assertStream(Where(flag='True'))
+        self.assertStream(Where(tags__cont='y'))
+        self.assertStream(Where({'name__cont': 'xyz'}, {'city__istart': u'\xe9'}))
+        self.assertStream(Where(name__nieq='zorro', _key_missing_=True))
+
+    def test_empty(self):
+        open(self.filename, 'w').close()
+        self.assertListEqual(list(iter_jsonl(self.filename, Where(name='a'))), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
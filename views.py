@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+
+from itertools import ifilter, ifilterfalse, imap
+
+
+class FilterView(object):
+    """
+    Lazy result of filter(lazy=True) and view(): holds a source and the predicates to apply to it,
+    nothing is evaluated before the view is iterated.
+    Chained filter() calls only add predicates, which are all evaluated in a single pass.
+    The view can be iterated several times, it reflects the current state of its source.
+    """
+
+    def __init__(self, source, constructor, tests=()):
+        """ source is a callable returning an iterator over the elements,
+            constructor builds a container from an iterable (see materialize),
+            tests are (f, negate) pairs
+        """
+        self._source = source
+        self._constructor = constructor
+        self._tests = tuple(tests)
+
+    def __iter__(self):
+        # filtering iterators are nested, each element goes through all the tests before the next one
+        iterator = self._source()
+        for f, negate in self._tests:
+            iterator = ifilterfalse(f, iterator) if negate else ifilter(f, iterator)
+        return iterator
+
+    def __repr__(self):
+        return '%s(%r)' % (self.__class__.__name__, list(self))
+
+    def materialize(self):
+        """ Returns a container (of the class the eager method would have returned) of the elements
+        """
+        return self._constructor(iter(self))
+
+    # immutable methods (return another view)
+
+    def filter(self, f=bool, negate=False):
+        """ Returns a view only retaining elements of self that satisfy f
+        """
+        return self.__class__(self._source, self._constructor, self._tests + ((f, negate),))
+
+    # helper methods (return a value)
+
+    def first(self, f=bool, negate=False):
+        """ Returns the first element that satisfies f
+        """
+        for x in self.filter(f, negate):
+            return x
+
+    def all(self, f=bool):
+        """ True if all elements satisfy f
+        """
+        return all(imap(f, self))
+
+    def any(self, f=bool):
+        """ True if any element satisfy f
+        """
+        return any(imap(f, self))
+
+    def count(self, f=bool):
+        """ Returns the number of elements that satisfy f
+        """
+        return sum(1 for _ in self.filter(f))